@@ -1,9 +1,42 @@
 
 from pathlib import Path
+import os
+import sys
+import time
 import argparse
-from datetime import datetime
-from itertools import chain
+import json
+import hashlib
+import heapq
+import pickle
+import tempfile
+import threading
+import queue
+import sqlite3
+import re
+import cProfile
+import gzip
+import lzma
+import bz2
+from datetime import datetime, timedelta, timezone
+from itertools import chain, islice
+from collections import namedtuple, Counter
+from operator import itemgetter
+from copy import copy, deepcopy
+from contextlib import contextmanager, nullcontext
+from multiprocessing import Pool
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from email.utils import formatdate, parsedate_to_datetime
 from lxml import etree
+try:
+    import resource
+except ImportError:
+    # no peak memory (Windows)
+    resource = None
+try:
+    # batched timestamp conversion
+    import numpy as np
+except ImportError:
+    np = None
 
 
 __version__ = '0.0.1'
@@ -23,118 +56,1508 @@ def file_size(path):
     return path.stat().st_size
 
 
-class Converter:
+def peak_memory():
+    """Peak RSS of the current process in bytes or None if unknown."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024  # bytes on macOS, KB on Linux
+
+
+def current_memory():
+    """Current RSS of the current process in bytes (Linux), peak RSS on other systems or None if unknown."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return peak_memory()
+
+
+#: Supported compressions, by file extension.
+COMPRESSIONS = ('gz', 'xz', 'bz2')
+
+_MAGIC = ((b'\x1f\x8b', 'gz'), (b'\xfd7zXZ\x00', 'xz'), (b'BZh', 'bz2'))
+
+
+def compression(path, *, magic=True):
+    """Detect file compression by extension or by magic bytes. Returns None for plain file."""
+    path = Path(path)
+    ext = path.suffix[1:].lower()
+    if ext in COMPRESSIONS:
+        return ext
+    if magic and path.exists():
+        with open(path, 'rb') as f:
+            head = f.read(6)
+        for sig, name in _MAGIC:
+            if head.startswith(sig):
+                return name
+    return None
+
+
+def open_input(path):
+    """Open file for binary read, decompress on the fly."""
+    comp = compression(path)
+    if comp == 'gz':
+        return gzip.open(path, 'rb')
+    if comp == 'xz':
+        return lzma.open(path, 'rb')
+    if comp == 'bz2':
+        return bz2.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def open_output(path, compress=None, level=None):
+    """Open file for binary write, compress on the fly."""
+    if compress == 'gz':
+        # no mtime in header, the same output for the same data
+        return gzip.GzipFile(path, 'wb', compresslevel=9 if level is None else level, mtime=0)
+    if compress == 'xz':
+        return lzma.open(path, 'wb', preset=level)
+    if compress == 'bz2':
+        return bz2.open(path, 'wb', compresslevel=9 if level is None else level)
+    return open(path, 'wb')
+
+
+def load_channels(path):
+    """Load channel ID allowlist, one ID in line, "#" starts comment."""
+    with open(path, encoding='utf-8') as f:
+        return {cid for line in f if (cid := line.partition('#')[0].strip())}
+
+
+class CountingFile:
+    """File wrapper, counts read and written (uncompressed) bytes."""
+
+    def __init__(self, file):
+        self.file = file
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.size += len(data)
+        return data
+
+    def write(self, data):
+        self.size += len(data)
+        return self.file.write(data)
+
+    def __getattr__(self, key):
+        return getattr(self.file, key)
+
+
+class RawFile(CountingFile):
+    """Input file wrapper, keeps raw bytes read since the last cut (see `cut()`), used to hash programme blocks.
+
+    Elements are found by start tags, cutting is given up if anything could hide or fake them (comments,
+    CDATA or processing instructions with "<" inside, entity declarations).
+    """
+
+    _RE_PROGRAMME = re.compile(rb'<(?:programme|prog)[\s/>]')
+    _RE_HIDDEN = re.compile(rb'<!--(?:[^<-]|-(?!->))*<|<!\[CDATA\[(?:[^<\]]|\](?!\]>))*<|<\?(?:[^<?]|\?(?!>))*<'
+                            rb'|<!ENTITY')
+
+    def __init__(self, file):
+        super().__init__(file)
+        self.data = bytearray()
+        #: Cutting is given up, nothing is kept.
+        self.lost = False
+
+    def read(self, size=-1):
+        data = super().read(size)
+        if not self.lost:
+            self.data += data
+        return data
+
+    def _find(self, count, tag):
+        starts = self._RE_PROGRAMME.finditer(self.data)
+        if tag in ('programme', 'prog'):
+            return next((m.start() for m in islice(starts, count, None)), -1)
+        pos = next((m.start() for m in islice(starts, count - 1, None)), -1) if count else 0
+        if pos >= 0 and (m := re.compile(rb'<%s[\s/>]' % re.escape(tag.encode())).search(self.data, pos)):
+            return m.start()
+        return -1
 
-    OPTIONS = {'space', 'lang', 'icon', 'tag', 'timezone', 'category'}
+    def cut(self, count, tag):
+        """Cut before top-level element `tag` ("/tv" for root end tag), which follows `count` programmes.
 
-    def __init__(self, path, *, options, output=None, local=None):
+        The first programme is at the previous cut. Returns raw bytes before the cut or None if cutting is lost.
+        """
+        if self.lost:
+            return None
+        pos = self._find(count, tag)
+        # "<" at the cut is checked too, it could be in not closed comment
+        if pos < 0 or self._RE_HIDDEN.search(self.data, 0, pos + 1):
+            self.lost = True
+            self.data.clear()
+            return None
+        data = bytes(self.data[:pos])
+        del self.data[:pos]
+        return data
+
+
+class Timestamps:
+    """Fast XMLTV timestamp converter: "YYYYmmddHHMMSS +HHMM" -> local "YYYYmmddHHMMSS"."""
+
+    #: Timestamp digit positions in `numpy.datetime_as_string()` output ("YYYY-MM-DDTHH:MM:SS").
+    _ISO_DIGITS = (0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18)
+
+    def __init__(self, local: timedelta):
+        self.local = local
+        #: Deltas (local - offset) by offset text.
+        self._deltas = {}
+        #: Converted minutes ("YYYYmmddHHMM") by (minutes, offset), seconds are copied as is.
+        self._minutes = {}
+
+    def _slow(self, value):
+        d = datetime.strptime(value, '%Y%m%d%H%M%S %z')
+        d = (d - d.utcoffset() + self.local).replace(tzinfo=None)
+        return f'{d:%Y%m%d%H%M%S}'
+
+    def _delta(self, offset):
+        try:
+            return self._deltas[offset]
+        except KeyError:
+            pass
+        delta = None
+        if len(offset) == 5 and offset[0] in '+-' and offset[1:].isdigit() and offset[1:].isascii():
+            minutes = int(offset[3:])
+            if minutes < 60 and int(offset[1:3]) < 24:  # strptime('%z') rejects 24 hours and more
+                delta = timedelta(hours=int(offset[1:3]), minutes=minutes)
+                if offset[0] == '+':
+                    delta = -delta
+                delta += self.local
+                if delta.microseconds or delta.seconds % 60:
+                    delta = None  # minutes cache could not be used
+        self._deltas[offset] = delta
+        return delta
+
+    def convert(self, value):
+        """Convert single timestamp, the same result as strptime() & strftime()."""
+        stamp = value[:14]
+        if (len(value) != 20 or value[14] != ' ' or not stamp.isdigit() or not stamp.isascii()
+                or stamp[12] > '5'):
+            return self._slow(value)
+        offset = value[15:]
+        delta = self._delta(offset)
+        if delta is None:
+            return self._slow(value)
+        key = stamp[:12], offset
+        try:
+            return self._minutes[key] + stamp[12:]
+        except KeyError:
+            pass
+        d = datetime(int(stamp[:4]), int(stamp[4:6]), int(stamp[6:8]), int(stamp[8:10]), int(stamp[10:12])) + delta
+        if d.year < 1000:
+            return self._slow(value)  # strftime('%Y') does not pad
+        minutes = self._minutes[key] = f'{d:%Y%m%d%H%M}'
+        return minutes + stamp[12:]
+
+    def convert_many(self, values):
+        """Convert list of timestamps, vectorized if NumPy is available."""
+        if np is None or len(values) < 2 or self.local.microseconds:
+            return [self.convert(v) for v in values]
+        size = len(values)
+        codes = np.array(values, dtype='U21').view(np.uint32).reshape(size, 21)
+        digits = codes.astype(np.int64) - ord('0')
+        stamp, sign, offset = digits[:, :14], codes[:, 15], digits[:, 16:20]
+        valid = ((codes[:, 20] == 0) & (codes[:, 14] == ord(' ')) & ((sign == ord('+')) | (sign == ord('-')))
+                 & ((stamp >= 0) & (stamp <= 9)).all(axis=1) & ((offset >= 0) & (offset <= 9)).all(axis=1))
+
+        def number(a, start, end):
+            n = np.zeros(size, dtype=np.int64)
+            for i in range(start, end):
+                n = n * 10 + a[:, i]
+            return n
+
+        year, month, day = number(stamp, 0, 4), number(stamp, 4, 6), number(stamp, 6, 8)
+        hour, minute, second = number(stamp, 8, 10), number(stamp, 10, 12), number(stamp, 12, 14)
+        off = number(offset, 0, 2) * 3600 + number(offset, 2, 4) * 60
+        valid &= ((month >= 1) & (month <= 12) & (day >= 1) & (day <= 31) & (hour <= 23) & (minute <= 59)
+                  & (second <= 59) & (number(offset, 0, 2) <= 23) & (number(offset, 2, 4) <= 59) & (year >= 1))
+        year, month, day = np.where(valid, year, 1970), np.where(valid, month, 1), np.where(valid, day, 1)
+        months = (year - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (month - 1)
+        days = months.astype('datetime64[D]') + (day - 1)
+        valid &= days.astype('datetime64[M]') == months  # day out of month
+        off = np.where(sign == ord('-'), -off, off)
+        local = self.local.days * 86400 + self.local.seconds
+        result = days.astype('datetime64[s]') + (hour * 3600 + minute * 60 + second - off + local)
+        valid &= ((result >= np.datetime64('1000-01-01T00:00:00'))
+                  & (result < np.datetime64('10000-01-01T00:00:00')))
+        text = np.datetime_as_string(np.where(valid, result, np.datetime64(0, 's')), unit='s')
+        text = np.ascontiguousarray(text.astype('U19').view(np.uint32).reshape(size, 19)[:, self._ISO_DIGITS])
+        out = text.view('U14').ravel().tolist()
+        for i in np.flatnonzero(~valid).tolist():
+            out[i] = self.convert(values[i])
+        return out
+
+
+class Shortcuts:
+    """Stable shortcut IDs (derived from value content), could be kept in sidecar JSON file."""
+
+    def __init__(self, path=None):
+        self.path = None if path is None else Path(path)
+        self.by_value = {}
+        self.by_id = {}
+        self.modified = False
+        # registry could be shared by profile writers (threads)
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    def load(self):
+        with open(self.path) as f:
+            data = json.load(f)
+        for sid, value in data.get('shortcuts', {}).items():
+            self.by_id[sid] = value
+            self.by_value[value] = sid
+
+    def save(self):
+        if self.path is None or not self.modified:
+            return
+        with self._lock:
+            tmp = self.path.with_name(f'{self.path.name}.tmp')
+            with open(tmp, 'w') as f:
+                json.dump({'version': 1, 'shortcuts': self.by_id}, f, indent=1, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self.modified = False
+
+    def get(self, value):
+        """Get shortcut ID for value, the same ID for the same value in every run."""
+        try:
+            return self.by_value[value]
+        except KeyError:
+            pass
+        with self._lock:
+            if (sid := self.by_value.get(value)) is not None:
+                return sid
+            # find unique id, the shortest hash prefix
+            hsh = hashlib.blake2b(value.encode('utf-8'), digest_size=8).hexdigest()
+            for i in range(4, len(hsh) + 1):
+                sid = hsh[:i]
+                if sid not in self.by_id:
+                    break
+            else:
+                raise ValueError(f'Shortcut hash collision for {value!r}')
+            self.by_value[value] = sid
+            self.by_id[sid] = value
+            self.modified = True
+            return sid
+
+
+class State:
+    """Incremental conversion state: converted programme blocks (per channel) from the previous run."""
+
+    VERSION = 2
+
+    def __init__(self, path, config):
         self.path = Path(path)
+        #: Conversion configuration, blocks are valid only for the same one.
+        self.config = config
+        #: Previous run blocks: key -> (hash, fragments (`Fragment` tuples), shortcuts).
+        self.blocks = {}
+        #: Current run blocks.
+        self.new_blocks = {}
+        if self.path.exists():
+            self.load()
+
+    def load(self):
+        with gzip.open(self.path, 'rb') as f:
+            data = pickle.load(f)
+        if data.get('version') == self.VERSION and data.get('config') == self.config:
+            self.blocks = data['blocks']
+
+    def save(self):
+        tmp = self.path.with_name(f'{self.path.name}.tmp')
+        with gzip.GzipFile(tmp, 'wb', compresslevel=1, mtime=0) as f:
+            pickle.dump({'version': self.VERSION, 'config': self.config, 'blocks': self.new_blocks}, f,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+
+#: Element written in stream mode: start tag, all nodes and end tag.
+Group = namedtuple('Group', 'tag attrib nodes')
+#: Converted programme serialized for output (written as is), category is taken out if grouped by category.
+Fragment = namedtuple('Fragment', 'channel start stop category data')
+
+
+class CategoryGroups:
+    """Programmes grouped by category, in one pass, category order by first occurrence."""
+
+    def __init__(self, *, sort=False, compact=False):
+        #: Sort programmes by channel and start in each category.
+        self.sort = sort
+        #: Keep serialized programmes (stream mode), element could be cleared after `add()`.
+        self.compact = compact
+        self.groups = {}
+
+    def add(self, node):
+        """Move programme (or `Fragment`) to its category group, category node is removed."""
+        if isinstance(node, Fragment):
+            name, item = node.category, node
+            channel, start = node.channel, node.start
+        else:
+            category = node.find('category')
+            if category is None:
+                name = None
+            else:
+                name = category.text
+                node.remove(category)
+            item = etree.tostring(node, encoding='utf-8') if self.compact else node
+            channel, start = node.get('channel'), node.get('start')
+        if self.sort:
+            item = (channel or '', start or ''), item
+        self.groups.setdefault(name, []).append(item)
+
+    def __iter__(self):
+        """Yield (name, nodes) for every category."""
+        for name, items in self.groups.items():
+            if self.sort:
+                items.sort(key=itemgetter(0))
+                items = [item for _, item in items]
+            if self.compact:
+                items = (item if isinstance(item, Fragment) else etree.fromstring(item) for item in items)
+            yield name, items
+
+    def group_nodes(self):
+        """Yield category groups for `Converter.write_stream()`."""
+        for name, nodes in self:
+            yield Group('category', {} if name is None else {'category': name}, nodes)
+
+
+class Stats:
+    """Converter stage statistics: wall and CPU time, elements touched, RSS delta (see --stats)."""
+
+    def __init__(self, profile=False):
+        #: Stage records (dicts) in run order.
+        self.stages = []
+        #: Profile every stage (cProfile), only the hottest one is kept.
+        self.profile = profile
+        self._profile = None
+
+    @contextmanager
+    def stage(self, name):
+        """Measure stage, yields record, set its "elements" item to number of touched elements."""
+        record = {'stage': name, 'elements': None}
+        profile = cProfile.Profile() if self.profile else None
+        rss = current_memory()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+            record['time'] = time.perf_counter() - wall
+            record['cpu'] = time.process_time() - cpu
+            record['rss'] = None if rss is None else current_memory() - rss
+            if profile is not None and (self._profile is None or record['time'] > self._profile[0]['time']):
+                self._profile = record, profile
+            self.stages.append(record)
+
+    def dump_profile(self, path):
+        """Write cProfile stats of the hottest stage (see `pstats`), returns the stage name."""
+        if self._profile is None:
+            return None
+        record, profile = self._profile
+        profile.dump_stats(path)
+        return record['stage']
+
+    def as_dict(self):
+        return {
+            'stages': self.stages,
+            'time': sum(r['time'] for r in self.stages),
+            'cpu': sum(r['cpu'] for r in self.stages),
+            'peak_memory': peak_memory(),
+        }
+
+    @staticmethod
+    def table(data):
+        """Return human-readable table of stats data (see `as_dict()`)."""
+        def rss(size):
+            if size is None:
+                return '---'
+            return f'-{human_size(-size)}' if size < 0 else f'+{human_size(size)}'
+
+        width = max((len(r['stage']) for r in data['stages']), default=5)
+        lines = [f'{"Stage":{width}}  {"Wall":>8}  {"CPU":>8}  {"Elements":>9}  {"RSS delta":>10}']
+        for r in data['stages']:
+            elements = '---' if r['elements'] is None else r['elements']
+            lines.append(f'{r["stage"]:{width}}  {r["time"]:7.3f}s  {r["cpu"]:7.3f}s  {elements:>9}'
+                         f'  {rss(r["rss"]):>10}')
+        peak = '---' if data['peak_memory'] is None else human_size(data['peak_memory'])
+        lines.append(f'{"total":{width}}  {data["time"]:7.3f}s  {data["cpu"]:7.3f}s  {"":9}  {"peak " + peak:>10}')
+        return '\n'.join(lines)
+
+
+class Converter:
+
+    OPTIONS = {'space', 'lang', 'icon', 'tag', 'timezone', 'category', 'dict', 'overlap'}
+    #: Options used if not set, the `dict` format needs support in the client, `overlap` changes programmes.
+    DEFAULT_OPTIONS = OPTIONS - {'dict', 'overlap'}
+    #: Tree conversion stages in run order (`convert_*` methods).
+    STAGES = ('lang', 'icon', 'timezone', 'overlap', 'tag', 'dict', 'category')
+    #: How to handle overlapping programmes (`overlap` option): trim the previous one or flag the next one.
+    OVERLAP_MODES = ('trim', 'flag')
+    #: Stages could be done once for many profiles, they do not use shortcuts and do not change tags.
+    SHARED_OPTIONS = {'lang', 'timezone'}
+    #: Number of element batches buffered for every profile writer and batch size (stream mode).
+    PROFILE_QUEUE = 8
+    PROFILE_BATCH = 500
+    #: Programme attributes handled by `dict` (all leaf texts are handled too).
+    DICT_ATTRS = ('system', 'role')
+    #: Shorter texts are not worth a reference.
+    DICT_MIN_LENGTH = 8
+    #: Text looks like a reference, have to be always in dictionary.
+    _RE_DICT_REF = re.compile(r'\{[0-9a-f]+\}')
+    #: Number of programmes sorted in memory while merging, bigger parts are spilled to temporary files.
+    MERGE_CHUNK = 100_000
+    #: Output formats.
+    FORMATS = ('xml', 'sqlite')
+    #: Number of rows in single SQLite bulk insert.
+    SQLITE_BATCH = 10_000
+    SQLITE_SCHEMA = '''
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE shortcut (id TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE channel (id TEXT PRIMARY KEY, name TEXT, icon TEXT, data TEXT NOT NULL);
+        CREATE TABLE category (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+        CREATE TABLE programme (
+            channel TEXT NOT NULL,
+            start TEXT NOT NULL,
+            stop TEXT,
+            title TEXT,
+            desc TEXT,
+            category INTEGER REFERENCES category (id),
+            icon TEXT,
+            data TEXT NOT NULL
+        );
+    '''
+
+    def __init__(self, path, *, options, output=None, local=None, sort=False, shortcuts=None, dict_min=4,
+                 compress=None, compress_level=None, channels=None, window=None, state=None, format=None,
+                 index=False, stats=None, overlap='trim'):
+        #: All inputs, merged if more then one, first has the highest precedence.
+        self.paths = [Path(p) for p in ((path,) if isinstance(path, (str, Path)) else path)]
+        self.path = self.paths[0]
         self.options = options
+        self.sort = sort
+        #: Minimal number of occurrences to put the value in the dictionary.
+        self.dict_min = dict_min
+        #: Value (hash) occurrences, for `dict` option.
+        self.dict_counts = Counter()
         if output is None:
             self.output = self.path.parent / f'{self.path.stem}.new{self.path.suffix}'
         else:
             self.output = Path(output)
+        if format is None:
+            format = 'sqlite' if self.output.suffix in ('.sqlite', '.sqlite3', '.db') else 'xml'
+        elif output is None and format != 'xml':
+            self.output = self.output.with_suffix(f'.{format}')
+        #: Output format (see FORMATS).
+        self.format = format
+        if compress is None:
+            compress = compression(self.output, magic=False)
+        #: Output compression (see COMPRESSIONS) or None.
+        self.compress = None if compress == 'none' else compress
+        self.compress_level = compress_level
+        #: Sidecar byte-offset index path (see epgindex.py) or None.
+        self.index = None
+        if index:
+            if self.compress or self.format != 'xml':
+                raise ValueError('Index needs uncompressed XML output')
+            self.index = self.output.with_name(f'{self.output.name}.idx')
+        #: Uncompressed input and output sizes.
+        self.input_size = self.output_size = None
         self.tree = None
         self.root: etree.Element = None
+        #: Output DOCTYPE, if not the same as input (merge).
+        self.doctype = None
+        #: Shortcut registry, shared between runs and feeds if has path.
+        self.shortcuts = shortcuts if isinstance(shortcuts, Shortcuts) else Shortcuts(shortcuts)
+        #: Shortcuts used in this output.
         self.by_value = {}
         self.by_id = {}
         if local is None:
             t = 86400  # one day (to avoid negative TZ at timestamo 0)
             self.local = datetime.fromtimestamp(t) - datetime.utcfromtimestamp(t)
         else:
-            self.local = datetime.strptime(local, '%z').tzinfo.utcoffset()
+            self.local = datetime.strptime(local, '%z').tzinfo.utcoffset(None)
+        self.timestamps = Timestamps(self.local)
+        #: Channel ID allowlist or None (all channels).
+        self.channels = None if channels is None else set(channels)
+        #: Programme time window (from, to) in UTC or None, open if from or to is None.
+        self.window = None
+        if window is not None:
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            self.window = tuple(None if w is None else now + w for w in window)
+            self._window_utc = tuple('' if w is None else f'{w:%Y%m%d%H%M%S}' for w in self.window)
+            self._window_local = tuple('' if w is None else f'{w + self.local:%Y%m%d%H%M%S}' for w in self.window)
+        self._utc = Timestamps(timedelta(0))
+        #: Number of dropped elements (channels, window).
+        self.pruned = 0
+        #: Number of dropped duplicates (merge).
+        self.duplicates = 0
+        #: Incremental conversion state or None.
+        self.state = None
+        if state is not None:
+            if 'dict' in self.options:
+                raise ValueError('Incremental conversion does not work with dict option')
+            config = f'{__version__};{",".join(sorted(self.options))};{self.local.total_seconds()}'
+            self.state = State(state, config)
+        #: Shortcut IDs used by currently converted block (incremental).
+        self._used = None
+        #: Raw input (RawFile) for block hashing or None (incremental).
+        self._raw = None
+        #: Number of reused and converted programme blocks (incremental).
+        self.reused = self.converted = 0
+        #: Stage statistics (Stats) or None.
+        self.stats = stats
+        #: Overlapping programmes mode (see OVERLAP_MODES).
+        self.overlap = overlap
+        #: Number of programmes: "duplicate" (dropped), "trimmed", "flagged", "dropped" (nothing left after trim).
+        self.overlaps = Counter()
+
+    def _stage(self, name):
+        """Return stage context, yields stats record (dict), dummy if stats are disabled."""
+        if self.stats is None:
+            return nullcontext({})
+        return self.stats.stage(name)
+
+    def run(self):
+        """Load, process and write whole tree."""
+        with self._stage('load') as stage:
+            self.load()
+            stage['elements'] = len(self.root)
+        self.process()
+        with self._stage('write') as stage:
+            self.write()
+            stage['elements'] = len(self.root)
 
     def load(self):
-        parser = etree.XMLParser(remove_blank_text=True)
-        self.tree = etree.parse(str(self.path), parser)
-        self.root = self.tree.getroot()
+        if len(self.paths) > 1:
+            nodes = self.iterload()
+            self.root.extend(nodes)
+            return
+        if self.channels is None and self.window is None:
+            parser = etree.XMLParser(remove_blank_text=True)
+            with open_input(self.path) as f:
+                src = CountingFile(f)
+                self.tree = etree.parse(src, parser)
+            self.input_size = src.size
+            self.root = self.tree.getroot()
+            return
+        # drop elements just after parse, keep only needed
+        with open_input(self.path) as f:
+            src = CountingFile(f)
+            context = etree.iterparse(src, events=('start', 'end'), remove_blank_text=True)
+            _, self.root = next(context)
+            for node in self._iter_nodes(context, self.root, free=False):
+                if not self.keep(node):
+                    self.root.remove(node)
+        self.input_size = src.size
+        self.tree = self.root.getroottree()
+
+    def iterload(self):
+        """Start incremental parsing, return iterator over top-level elements (channels, programmes...)."""
+        if len(self.paths) > 1:
+            return self._open_merge()
+        filtered = self.channels is not None or self.window is not None
+        if self.state is not None and not filtered:
+            # blocks are hashed on raw input, elements are freed in `_incremental()`
+            src = self._raw = RawFile(open_input(self.path))
+        else:
+            src = CountingFile(open_input(self.path))
+        context = etree.iterparse(src, events=('start', 'end'), remove_blank_text=True)
+        _, self.root = next(context)
+        self.tree = self.root.getroottree()
+        nodes = self._iter_input(src, context)
+        if filtered:
+            nodes = filter(self.keep, nodes)
+        return nodes
+
+    def _iter_input(self, src, context):
+        try:
+            yield from self._iter_nodes(context, self.root, free=self._raw is None)
+        finally:
+            src.close()
+            self.input_size = src.size
+
+    def _open_merge(self):
+        """Open all inputs for k-way merge, root is taken from the first one."""
+        sources = []
+        for path in self.paths:
+            src = CountingFile(open_input(path))
+            context = etree.iterparse(src, events=('start', 'end'), remove_blank_text=True)
+            _, root = next(context)
+            sources.append((src, self._iter_nodes(context, root)))
+            if self.root is None:
+                self.root = etree.Element(root.tag, root.attrib)
+                self.tree = etree.ElementTree(self.root)
+                self.doctype = root.getroottree().docinfo.doctype
+        return self._iter_merge(sources)
+
+    def _iter_merge(self, sources):
+        """Merge inputs: channels (the first wins) and then programmes ordered by channel and start.
+
+        Programmes with the same channel and start are duplicates, the one from the first input wins.
+        """
+        try:
+            # XMLTV starts with channels, take them from all inputs and stop at the first programme
+            seen = set()
+            programmes = []
+            for src, nodes in sources:
+                head = None
+                for node in nodes:
+                    if node.tag in ('programme', 'prog'):
+                        head = node
+                        break
+                    key = node.tag, node.get('id')
+                    if key in seen:
+                        self.duplicates += 1
+                    elif self.keep(node):
+                        seen.add(key)
+                        yield deepcopy(node)  # source node is cleared soon
+                programmes.append(nodes if head is None else chain((head,), nodes))
+            # every input is sorted in runs, runs are merged
+            runs = []
+            for index, nodes in enumerate(programmes):
+                runs.extend(self._sorted_runs(index, filter(self.keep, nodes)))
+            last = None
+            for channel, start, _, _, data in heapq.merge(*runs):
+                if (channel, start) == last:
+                    self.duplicates += 1
+                    continue
+                last = channel, start
+                yield etree.fromstring(data)
+        finally:
+            for src, _ in sources:
+                src.close()
+            self.input_size = sum(src.size for src, _ in sources)
+
+    def _sorted_runs(self, index, nodes):
+        """Sort input programmes by (channel, UTC start), return sorted runs (external sort)."""
+        def spill(chunk):
+            chunk.sort()
+            f = tempfile.TemporaryFile()
+            for item in chunk:
+                pickle.dump(item, f, pickle.HIGHEST_PROTOCOL)
+            return read(f)
+
+        def read(f):
+            with f:
+                f.seek(0)
+                while True:
+                    try:
+                        yield pickle.load(f)
+                    except EOFError:
+                        break
+
+        runs = []
+        chunk = []
+        for seq, node in enumerate(nodes):
+            start = node.get('start') or ''
+            if ' ' in start:
+                start = self._utc.convert(start)
+            chunk.append((node.get('channel') or '', start, index, seq, etree.tostring(node, encoding='utf-8')))
+            if len(chunk) >= self.MERGE_CHUNK:
+                runs.append(spill(chunk))
+                chunk = []
+        chunk.sort()
+        runs.append(iter(chunk))
+        return runs
+
+    @staticmethod
+    def _iter_nodes(context, root, *, free=True):
+        depth = 0
+        for event, node in context:
+            if event == 'start':
+                depth += 1
+            elif node is root:
+                break
+            else:
+                depth -= 1
+                if depth == 0:
+                    yield node
+                    if not free:
+                        continue
+                    # free already processed elements, keep memory flat
+                    node.clear()
+                    while node.getprevious() is not None:
+                        del root[0]
 
     def write(self):
+        if self.format == 'sqlite':
+            self.write_sqlite(iter(self.root))
+            return
+        if self.index is not None:
+            # offsets are known only in incremental writer
+            self.write_stream(Group(node.tag, dict(node.attrib), iter(node)) if node.tag == 'category' else node
+                              for node in self.root if node.tag != 'shortcuts')
+            return
         pretty_print = 'space' not in self.options
-        self.tree.write(str(self.output), xml_declaration=True, encoding='utf-8', pretty_print=pretty_print)
+        with open_output(self.output, self.compress, self.compress_level) as f:
+            dst = CountingFile(f)
+            self.tree.write(dst, xml_declaration=True, encoding='utf-8', pretty_print=pretty_print,
+                            doctype=self.doctype)
+        self.output_size = dst.size
+        self.shortcuts.save()
+
+    def write_stream(self, nodes):
+        """Write elements incrementally. Root must be known (see `iterload()`)."""
+        def write(node, group=None):
+            nonlocal block
+            fragment = isinstance(node, Fragment)
+            if index is not None:
+                if fragment or node.tag in ('programme', 'prog'):
+                    if fragment:
+                        channel, start, stop = node.channel, node.start or '', node.stop or ''
+                    else:
+                        channel, start, stop = node.get('channel'), node.get('start') or '', node.get('stop') or ''
+                    if block is None or block[0] != channel:
+                        close_block()
+                        block = [channel, position(), start, stop, group]
+                    else:
+                        block[2], block[3] = min(block[2], start), max(block[3], stop)
+                else:
+                    close_block()
+                    if node.tag == 'channel':
+                        begin = position()
+                        xf.write(node, pretty_print=pretty_print)
+                        index['nodes'][node.get('id')] = [begin, position() - begin]
+                        return
+            if fragment:
+                xf.flush()
+                f.write(node.data)
+            else:
+                xf.write(node, pretty_print=pretty_print)
+
+        def position():
+            xf.flush()
+            return f.size
+
+        def close_block():
+            nonlocal block
+            if block is not None:
+                channel, begin, start, stop, group = block
+                index['channels'].setdefault(channel, []).append([begin, position() - begin, start, stop, group])
+                block = None
+
+        pretty_print = 'space' not in self.options
+        index = None if self.index is None else {'nodes': {}, 'channels': {}}
+        block = None
+        tmp = self.output.with_name(f'{self.output.name}.tmp')
+        try:
+            with open_output(tmp, self.compress, self.compress_level) as out:
+                f = CountingFile(out)
+                with etree.xmlfile(f, encoding='utf-8') as xf:
+                    xf.write_declaration()
+                    if doctype := self.doctype or self.tree.docinfo.doctype:
+                        xf.write_doctype(doctype)
+                    with xf.element(self.root.tag, dict(self.root.attrib)):
+                        if pretty_print:
+                            xf.write('\n')
+                        for node in nodes:
+                            if isinstance(node, Group):
+                                close_block()
+                                with xf.element(node.tag, node.attrib):
+                                    if pretty_print:
+                                        xf.write('\n')
+                                    for sub in node.nodes:
+                                        write(sub, node.attrib.get('category'))
+                                    close_block()
+                                if pretty_print:
+                                    xf.write('\n')
+                            else:
+                                write(node)
+                        close_block()
+                        # shortcuts are known at the end, written last (single pass, see `GuideReader`)
+                        offset = position()
+                        if self.by_id:
+                            node = etree.Element('shortcuts')
+                            for sid, value in self.by_id.items():
+                                node.append(etree.Element('short', id=sid, value=value))
+                            xf.write(node, pretty_print=pretty_print)
+                        shortcuts = [offset, position() - offset]
+            self.output_size = f.size
+            os.replace(tmp, self.output)
+        except BaseException:
+            # do not leave partial file next to output
+            tmp.unlink(missing_ok=True)
+            raise
+        self.shortcuts.save()
+        if index is not None:
+            index.update(version=1, size=self.output_size, shortcuts=shortcuts)
+            with open(self.index, 'w') as f:
+                json.dump(index, f, separators=(',', ':'), ensure_ascii=False)
+
+    def write_sqlite(self, nodes):
+        """Write elements to SQLite database, built in temporary file and renamed at the end."""
+        def text(node, *tags):
+            for tag in tags:
+                if (sub := node.find(tag)) is not None and sub.text:
+                    return sub.text
+            return None
+
+        def category_id(name):
+            if name is None:
+                return None
+            try:
+                return categories[name]
+            except KeyError:
+                cid = categories[name] = len(categories) + 1
+                db.execute('INSERT INTO category (id, name) VALUES (?, ?)', (cid, name))
+                return cid
+
+        def add_programme(node, category=None):
+            if isinstance(node, Fragment):
+                category = category or node.category
+                node = etree.fromstring(node.data)
+            if category is None:
+                category = text(node, 'category')
+            icon = node.find('icon')
+            programmes.append((node.get('channel'), node.get('start'), node.get('stop'),
+                               text(node, 'title'), text(node, 'desc'), category_id(category),
+                               None if icon is None else icon.get('src'),
+                               etree.tostring(node, encoding='unicode')))
+            if len(programmes) >= self.SQLITE_BATCH:
+                flush()
+
+        def flush():
+            db.executemany('INSERT INTO programme VALUES (?, ?, ?, ?, ?, ?, ?, ?)', programmes)
+            programmes.clear()
+
+        tmp = self.output.with_name(f'{self.output.name}.tmp')
+        tmp.unlink(missing_ok=True)
+        db = sqlite3.connect(tmp)
+        try:
+            # temporary file, nothing to recover
+            db.execute('PRAGMA journal_mode = OFF')
+            db.execute('PRAGMA synchronous = OFF')
+            db.executescript(self.SQLITE_SCHEMA)
+            categories = {}
+            programmes = []
+            for node in nodes:
+                if isinstance(node, Group):
+                    for sub in node.nodes:
+                        add_programme(sub, node.attrib.get('category'))
+                elif isinstance(node, Fragment):
+                    add_programme(node)
+                elif node.tag == 'category':
+                    for sub in node:
+                        add_programme(sub, node.get('category'))
+                elif node.tag in ('programme', 'prog'):
+                    add_programme(node)
+                elif node.tag == 'channel':
+                    icon = node.find('icon')
+                    db.execute('INSERT OR IGNORE INTO channel VALUES (?, ?, ?, ?)',
+                               (node.get('id'), text(node, 'display-name', 'name'),
+                                None if icon is None else icon.get('src'), etree.tostring(node, encoding='unicode')))
+            flush()
+            db.executemany('INSERT INTO shortcut VALUES (?, ?)', self.by_id.items())
+            db.executemany('INSERT INTO meta VALUES (?, ?)', (
+                ('version', __version__),
+                ('root', json.dumps({'tag': self.root.tag, 'attrib': dict(self.root.attrib)})),
+                ('options', ','.join(sorted(self.options))),
+            ))
+            # index at the end, faster then on every insert
+            db.execute('CREATE INDEX programme_channel_start ON programme (channel, start)')
+            db.commit()
+        finally:
+            db.close()
+        self.shortcuts.save()
+        os.replace(tmp, self.output)
+        self.output_size = file_size(self.output)
+
+    def _window_stamp(self, value):
+        """Return comparable timestamp and window bounds for it."""
+        if ' ' in value:
+            return self._utc.convert(value), self._window_utc
+        return value[:14], self._window_local  # local time already
+
+    def _keep(self, node):
+        if node.tag == 'channel':
+            return self.channels is None or node.get('id') in self.channels
+        if node.tag in ('programme', 'prog'):
+            if self.channels is not None and node.get('channel') not in self.channels:
+                return False
+            if self.window is not None:
+                if start := node.get('start'):
+                    stamp, (_, until) = self._window_stamp(start)
+                    if until and stamp >= until:
+                        return False
+                if stop := node.get('stop') or start:
+                    stamp, (since, _) = self._window_stamp(stop)
+                    if since and stamp <= since:
+                        return False
+        return True
+
+    def keep(self, node):
+        """Check channel allowlist and time window, count dropped elements."""
+        if self._keep(node):
+            return True
+        self.pruned += 1
+        return False
 
     def shorcut(self, value):
         """Get shortcut ID for value."""
         try:
             sid = self.by_value[value]
         except KeyError:
-            # find unique icon id
-            hsh = hash(value)
-            for i in range(4, 8):
-                sid = f'{abs(hsh):x}'[:i]
-                if sid not in self.by_id:
-                    break
+            sid = self.shortcuts.get(value)
             self.by_value[value] = sid
             self.by_id[sid] = value
+        if self._used is not None:
+            self._used[sid] = None  # ordered set
         return sid
 
+    def _reuse_shortcuts(self, shortcuts):
+        """Register shortcuts of cached block, False if any conflicts with current ones."""
+        registry = self.shortcuts
+        if any(registry.by_id.get(sid, value) != value or registry.by_value.get(value, sid) != sid
+               for sid, value in shortcuts):
+            return False
+        for sid, value in shortcuts:
+            if sid not in registry.by_id:
+                registry.by_id[sid] = value
+                registry.by_value[value] = sid
+                registry.modified = True
+            self.by_value[value] = sid
+            self.by_id[sid] = value
+        return True
+
     def add_shortcut_nodes(self):
+        """Add shortcuts used in this output to the tree, returns number of shortcuts."""
         if self.by_id:
             node = self.root.find('./shortcuts')
             if node is None:
                 node = etree.Element('shortcuts')
                 self.root.insert(0, node)
+            existing = {short.get('id') for short in node}
             for sid, value in self.by_id.items():
-                if node.find(f'./*[@id="{sid}"]') is None:
+                if sid not in existing:
                     node.append(etree.Element('short', id=sid, value=value))
+        return len(self.by_id)
+
+    def _convert_lang(self, node):
+        if node.get('lang') == 'pl':
+            del node.attrib['lang']
+
+    def _convert_icon(self, node):
+        url, sep, name = node.get('src').rpartition('/')
+        if sep and url:
+            iid = self.shorcut(url)
+            node.attrib['src'] = f'{{{iid}}}/{name}'
+
+    def _convert_timezone(self, node):
+        for attr in ('start', 'stop'):
+            if ' ' in (node.get(attr) or ''):
+                node.set(attr, self.timestamps.convert(node.get(attr)))
+
+    def _dict_values(self, node):
+        """Yield (element, attribute, value) for all programme values handled by `dict`."""
+        for sub in node.iterdescendants(etree.Element):
+            if len(sub) == 0 and sub.text:
+                yield sub, None, sub.text
+            for attr in self.DICT_ATTRS:
+                if value := sub.get(attr):
+                    yield sub, attr, value
+
+    def _count_dict(self, node):
+        for _, _, value in self._dict_values(node):
+            self.dict_counts[hash(value)] += 1
+
+    def _convert_dict(self, node):
+        for sub, attr, value in self._dict_values(node):
+            if ((len(value) >= self.DICT_MIN_LENGTH and self.dict_counts[hash(value)] >= self.dict_min)
+                    or self._RE_DICT_REF.fullmatch(value)):
+                ref = f'{{{self.shorcut(value)}}}'
+                if attr is None:
+                    sub.text = ref
+                else:
+                    sub.set(attr, ref)
+
+    def count_dict(self):
+        """Count `dict` values without loading whole tree (stream mode pre-pass).
+
+        Programmes dropped by `overlap` are skipped (counted after overlap in tree mode): duplicates,
+        and in trim mode also ones with the same start, the first one (document order) wins (see `_sweep()`).
+        """
+        seen = set() if 'overlap' in self.options else None
+        for path in self.paths:
+            with open_input(path) as f:
+                context = etree.iterparse(f, events=('start', 'end'), remove_blank_text=True)
+                _, root = next(context)
+                for node in self._iter_nodes(context, root):
+                    if node.tag in ('programme', 'prog') and self._keep(node):
+                        if seen is not None:
+                            key = (node.get('channel'), *self._interval(node))
+                            if self.overlap == 'trim':
+                                key = key[:2]
+                            if key in seen:
+                                continue
+                            seen.add(key)
+                        self._count_dict(node)
+
+    # Tree stages return number of touched elements.
 
     def convert_lang(self):
         self.root.attrib['lang'] = 'pl'
-        for node in self.root.iterfind('.//*[@lang]'):
-            if node.get('lang') == 'pl':
-                del node.attrib['lang']
+        count = 0
+        for count, node in enumerate(self.root.iterfind('.//*[@lang]'), 1):
+            self._convert_lang(node)
+        return count
 
     def convert_icon(self):
-        for node in self.root.iterfind('.//icon[@src]'):
-            url, sep, name = node.get('src').rpartition('/')
-            if sep and url:
-                iid = self.shorcut(url)
-                node.attrib['src'] = f'{{{iid}}}/{name}'
+        count = 0
+        for count, node in enumerate(self.root.iterfind('.//icon[@src]'), 1):
+            self._convert_icon(node)
+        return count
 
     def convert_tag(self):
-        for node in self.root.iterfind('./channel/display-name'):
-            node.tag = 'name'
-        for node in self.root.iterfind('.//programme'):
-            node.tag = 'prog'
+        count = 0
+        for count, node in enumerate(chain(self.root.iterfind('./channel/display-name'),
+                                           self.root.iterfind('.//programme')), 1):
+            node.tag = 'name' if node.tag == 'display-name' else 'prog'
+        return count
 
     def convert_timezone(self):
+        # all timestamps at once (vectorized)
+        values, nodes = [], []
         for node in self.root.iterfind('.//programme'):
             for attr in ('start', 'stop'):
-                if ' ' in (node.get(attr) or ''):
-                    d = datetime.strptime(node.get(attr), '%Y%m%d%H%M%S %z')
-                    d = (d - d.utcoffset() + self.local).replace(tzinfo=None)
-                    node.set(attr, f'{d:%Y%m%d%H%M%S}')
+                if ' ' in (value := node.get(attr) or ''):
+                    values.append(value)
+                    nodes.append((node, attr))
+        for (node, attr), value in zip(nodes, self.timestamps.convert_many(values)):
+            node.set(attr, value)
+        return len(values)
+
+    def convert_overlap(self):
+        channels = {}
+        for node in chain(self.root.iterfind('./programme'), self.root.iterfind('./prog')):
+            channels.setdefault(node.get('channel'), []).append(node)
+        for nodes in channels.values():
+            for node in self._sweep(nodes):
+                self.root.remove(node)
+        return sum(map(len, channels.values()))
+
+    def convert_dict(self):
+        programmes = list(chain(self.root.iterfind('./programme'), self.root.iterfind('./prog')))
+        for node in programmes:
+            self._count_dict(node)
+        for node in programmes:
+            self._convert_dict(node)
+        return len(programmes)
 
     def convert_category(self):
-        categories = {}
-        # for node in self.root.iterfind('.//programme|.//prog'):
-        for node in chain(self.root.iterfind('.//programme'), self.root.iterfind('.//prog')):
-            category = node.find('category')
-            if category is None:
-                name = None
-            else:
-                name = category.text
-                node.remove(category)
-            categories.setdefault(name, []).append(node)
-            self.root.remove(node)
-        for name, nodes in categories.items():
+        groups = CategoryGroups(sort=self.sort)
+        # for node in self.root.iterfind('./programme|./prog'):
+        programmes = list(chain(self.root.iterfind('./programme'), self.root.iterfind('./prog')))
+        for node in programmes:
+            groups.add(node)
+        # programmes are moved (not copied) from root to the new category nodes
+        for name, nodes in groups:
             category = etree.SubElement(self.root, 'category')
             if name is not None:
                 category.set('category', name)
             category.extend(nodes)
+        return len(programmes)
+
+    def _stream_overlap(self, nodes):
+        """Drop duplicates and handle overlaps per channel, like `convert_overlap()`, output in document order.
+
+        Programmes of a channel may be spread over the whole input (ex. time ordered feed), all are kept
+        (serialized) until the end, swept per channel and merged back in the input order.
+        """
+        def sweep(block):
+            programmes = [etree.fromstring(item.data if isinstance(item, Fragment) else item) for _, item in block]
+            dropped = self._sweep(programmes)
+            for (seq, item), node in zip(block, programmes):
+                if node not in dropped:
+                    yield seq, self._fragment(node, item.category) if isinstance(item, Fragment) else node
 
-    def process(self):
+        channels = {}
+        others = []
+        for seq, node in enumerate(nodes):
+            if isinstance(node, Fragment):
+                channels.setdefault(node.channel, []).append((seq, node))
+            elif node.tag in ('programme', 'prog'):
+                # element is cleared by parser, keep it serialized
+                channels.setdefault(node.get('channel'), []).append((seq, etree.tostring(node, encoding='utf-8')))
+            elif not channels:
+                # channels are first in XMLTV, nothing to wait for
+                yield node
+            else:
+                others.append((seq, deepcopy(node)))
+        blocks = [sweep(block) for block in channels.values()]
+        channels.clear()
+        for _, node in heapq.merge(iter(others), *blocks, key=itemgetter(0)):
+            yield node
+
+    def _interval(self, node):
+        """Return comparable programme (start, stop), UTC if timezone is not converted, empty if missing."""
+        start, stop = node.get('start') or '', node.get('stop') or ''
+        return tuple(self._utc.convert(value) if ' ' in value else value[:14] for value in (start, stop))
+
+    def _sweep(self, nodes):
+        """Drop duplicates, trim or flag overlaps of single channel programmes. Returns set of dropped nodes.
+
+        Programmes are sorted by start and stop, every one is checked against the (not dropped) one ending last.
+        Exact duplicates (the same start and stop) are dropped, the first one (document order) wins.
+        """
+        items = sorted(((*self._interval(node), i, node) for i, node in enumerate(nodes)), key=itemgetter(0, 1, 2))
+        dropped = set()
+        prev = last = None
+        for start, stop, i, node in items:
+            if prev is not None and (start, stop) == prev[:2]:
+                # duplicates are next to each other after sort
+                dropped.add(node)
+                self.overlaps['duplicate'] += 1
+                continue
+            current = start, stop, i, node
+            if last is not None and last[1] and start < last[1]:
+                lstart, lstop, li, lnode = last
+                if self.overlap == 'flag':
+                    node.set('overlap', '1')
+                    self.overlaps['flagged'] += 1
+                elif start == lstart:
+                    # nothing is left after trim, the first one (document order) wins
+                    self.overlaps['dropped'] += 1
+                    if li < i:
+                        dropped.add(node)
+                        continue
+                    dropped.add(lnode)
+                    last = current
+                else:
+                    lnode.set('stop', node.get('start'))
+                    self.overlaps['trimmed'] += 1
+                    last = current
+            prev = current
+            if last is None or stop > last[1]:
+                last = current
+        return dropped
+
+    def _stream_category(self, nodes):
+        groups = CategoryGroups(sort=self.sort, compact=True)
+        for node in nodes:
+            if isinstance(node, Fragment) or node.tag in ('programme', 'prog'):
+                groups.add(node)
+            else:
+                yield node
+        yield from groups.group_nodes()
+
+    def process(self, *, done=()):
+        """Convert whole tree, skip `done` stages (already converted, see `process_profiles()`)."""
+        options = self.options - set(done)
+        for name in self.STAGES:
+            if name in options:
+                with self._stage(f'convert_{name}') as stage:
+                    stage['elements'] = getattr(self, f'convert_{name}')()
+        with self._stage('add_shortcut_nodes') as stage:
+            stage['elements'] = self.add_shortcut_nodes()
+
+    def convert_node(self, node, *, done=()):
+        """Convert single top-level element (channel, programme) in place, used in stream mode."""
+        options = self.options - set(done) if done else self.options
+        if 'lang' in options:
+            self._convert_lang(node)
+            for sub in node.iterfind('.//*[@lang]'):
+                self._convert_lang(sub)
+        if 'icon' in options:
+            for sub in node.iterfind('.//icon[@src]'):
+                self._convert_icon(sub)
+        if 'timezone' in options and node.tag == 'programme':
+            self._convert_timezone(node)
+        if 'tag' in options:
+            if node.tag == 'channel':
+                for sub in node.iterfind('./display-name'):
+                    sub.tag = 'name'
+            elif node.tag == 'programme':
+                node.tag = 'prog'
+        if 'dict' in options and node.tag in ('programme', 'prog'):
+            self._convert_dict(node)
+        return node
+
+    def stream(self):
+        """Load, process and write in constant memory. Element by element."""
+        # stages are interleaved (element by element), measured as one
+        with self._stage('stream'):
+            if 'dict' in self.options:
+                self.count_dict()
+            self._stream_nodes(self.iterload())
+
+    def _stream_nodes(self, nodes, *, done=()):
+        """Process and write loaded elements (stream mode), skip `done` stages."""
         if 'lang' in self.options:
-            self.convert_lang()
-        if 'icon' in self.options:
-            self.convert_icon()
-        if 'timezone' in self.options:
-            self.convert_timezone()
-        if 'tag' in self.options:
-            self.convert_tag()
+            self.root.attrib['lang'] = 'pl'
+        if self.state is None:
+            nodes = (self.convert_node(node, done=done) for node in nodes)
+        else:
+            nodes = self._incremental(nodes)
+        if 'overlap' in self.options:
+            nodes = self._stream_overlap(nodes)
         if 'category' in self.options:
-            self.convert_category()
-        self.add_shortcut_nodes()
+            # programmes have to be kept (serialized) until the end
+            nodes = self._stream_category(nodes)
+        if self.format == 'sqlite':
+            self.write_sqlite(nodes)
+        else:
+            self.write_stream(nodes)
+        if self.state is not None:
+            self.state.save()
+
+    def _incremental(self, nodes):
+        """Convert only changed programme blocks (per channel), reuse converted blocks from state.
+
+        Block is hashed on its raw input bytes if possible (see `RawFile`), on serialized elements otherwise.
+        Programmes are passed as fragments (see `Fragment`), reused ones are not parsed again.
+        """
+        def flush(node):
+            # raw input of the block ends where the next element starts
+            if raw is not None:
+                if node is None:
+                    data = raw.cut(len(block), '/' + self.root.tag)
+                elif block or node.tag in ('programme', 'prog'):
+                    data = raw.cut(len(block), node.tag)
+            if not block:
+                return
+            key = f'{channel}#{seen[channel]}'
+            seen[channel] += 1
+            hsh = hashlib.blake2b(digest_size=16)
+            if raw is not None and data is not None:
+                hsh.update(data)
+            else:
+                for item in block:
+                    hsh.update(item if isinstance(item, bytes) else etree.tostring(item, encoding='utf-8'))
+            digest = hsh.digest()
+            cached = self.state.blocks.get(key)
+            if cached is not None and cached[0] == digest and self._reuse_shortcuts(cached[2]):
+                self.reused += 1
+                fragments, shortcuts = cached[1:]
+                yield from map(Fragment._make, fragments)
+            else:
+                self.converted += 1
+                self._used = {}
+                fragments = []
+                for item in block:
+                    fragment = self._fragment(self.convert_node(
+                        etree.fromstring(item) if isinstance(item, bytes) else item))
+                    fragments.append(tuple(fragment))
+                    yield fragment
+                shortcuts = [(sid, self.by_id[sid]) for sid in self._used]
+                self._used = None
+            self.state.new_blocks[key] = digest, fragments, shortcuts
+            block.clear()
+
+        def free(node):
+            # elements are kept by parser (raw input), drop all before the current one
+            while node.getprevious() is not None:
+                del self.root[0]
+
+        raw = self._raw
+        seen = Counter()
+        block = []
+        channel = None
+        for node in nodes:
+            if node.tag not in ('programme', 'prog'):
+                yield from flush(node)
+                yield self.convert_node(node)
+                if raw is not None:
+                    free(node)
+                continue
+            if node.get('channel') != channel:
+                yield from flush(node)
+                if raw is not None:
+                    free(node)
+                channel = node.get('channel')
+            # without raw input element is cleared by parser, keep it serialized
+            block.append(node if raw is not None else etree.tostring(node, encoding='utf-8'))
+        yield from flush(None)
+
+    def _fragment(self, node, category=None):
+        """Serialize converted programme for output, category is taken out if grouped by category."""
+        if category is None and 'category' in self.options and (sub := node.find('category')) is not None:
+            category = sub.text
+            node.remove(sub)
+        return Fragment(node.get('channel'), node.get('start'), node.get('stop'), category,
+                        etree.tostring(node, encoding='utf-8', pretty_print='space' not in self.options))
+
+    def process_profiles(self, profiles):
+        """Parse once, convert and write all profiles (converters with own options and output).
+
+        This converter options have to be shared stages (see SHARED_OPTIONS), done once for all profiles.
+        Every profile gets own copy of the tree (the last one the parsed tree), profiles are written one by one.
+        """
+        with self._stage('load') as stage:
+            self.load()
+            stage['elements'] = len(self.root)
+        self.process()
+        for i, profile in enumerate(profiles, 1):
+            # the last one takes the tree, no copy
+            profile.tree = self.tree if i == len(profiles) else deepcopy(self.tree)
+            profile.root = profile.tree.getroot()
+            profile.doctype = self.doctype
+            profile.input_size = self.input_size
+            profile.pruned, profile.duplicates = self.pruned, self.duplicates
+            profile.process(done=self.options)
+            profile.write()
+            profile.tree = profile.root = None
+        self.tree = self.root = None
+
+    def stream_profiles(self, profiles):
+        """Parse once, convert and write all profiles in constant memory (see `process_profiles()`).
+
+        Shared stages are done here, converted elements are passed (serialized, in batches) to profile writers
+        working in threads, every profile writer has own bounded queue.
+        """
+        def run(profile, elements):
+            def receive():
+                nonlocal finished
+                while isinstance(batch := elements.get(), list):
+                    yield from batch
+                finished = True
+                if batch is not None:
+                    raise batch
+            finished = False
+            try:
+                profile._stream_nodes(map(etree.fromstring, receive()), done=self.options)
+            except BaseException as exc:
+                errors.append(exc)
+                # do not block the parser
+                while not finished and isinstance(elements.get(), list):
+                    pass
+
+        with self._stage('stream'):
+            for profile in profiles:
+                if 'dict' in profile.options:
+                    profile.count_dict()
+            nodes = self.iterload()
+            if 'lang' in self.options:
+                self.root.attrib['lang'] = 'pl'
+            errors = []
+            queues = []
+            threads = []
+            for profile in profiles:
+                profile.root = etree.Element(self.root.tag, self.root.attrib)
+                profile.tree = etree.ElementTree(profile.root)
+                profile.doctype = self.doctype or self.tree.docinfo.doctype
+                queues.append(queue.Queue(self.PROFILE_QUEUE))
+                threads.append(threading.Thread(target=run, args=(profile, queues[-1]), daemon=True))
+                threads[-1].start()
+            # end of input, exception if the parser failed (profile outputs must not be written)
+            end = RuntimeError('Input parsing failed')
+            try:
+                batch = []
+                for node in nodes:
+                    batch.append(etree.tostring(self.convert_node(node), encoding='utf-8'))
+                    if len(batch) >= self.PROFILE_BATCH:
+                        for elements in queues:
+                            elements.put(batch)
+                        batch = []
+                for elements in queues:
+                    elements.put(batch)
+                end = None
+            finally:
+                for elements in queues:
+                    elements.put(end)
+                for thread in threads:
+                    thread.join()
+            for profile in profiles:
+                profile.input_size = self.input_size
+                profile.pruned, profile.duplicates = self.pruned, self.duplicates
+        if errors:
+            raise errors[0]
+
+
+class Guide:
+    """Converted output cached in memory for HTTP (see --serve)."""
+
+    #: Content type of compressed outputs, served as is.
+    CONTENT_TYPES = {'gz': 'application/gzip', 'xz': 'application/x-xz', 'bz2': 'application/x-bzip2'}
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.mtime = int(self.path.stat().st_mtime)
+        self.data = self.path.read_bytes()
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        self.etag = f'"{hashlib.blake2b(self.data, digest_size=16).hexdigest()}"'
+        comp = compression(self.path, magic=False)
+        if comp is not None:
+            self.content_type = self.CONTENT_TYPES[comp]
+            #: Precompressed (gzip) body or None.
+            self.gzip = self.gzip_etag = None
+        else:
+            sqlite = self.data.startswith(b'SQLite format 3\0')
+            self.content_type = 'application/vnd.sqlite3' if sqlite else 'application/xml; charset=utf-8'
+            self.gzip = gzip.compress(self.data, mtime=0)
+            self.gzip_etag = f'{self.etag[:-1]}-gz"'
+
+
+class GuideHandler(BaseHTTPRequestHandler):
+    """Serve guides from memory (server `guides` dict, name -> Guide), the first one on "/"."""
+
+    server_version = f'epg-killer/{__version__}'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._send(body=True)
+
+    def do_HEAD(self):
+        self._send(body=False)
+
+    def log_request(self, code='-', size='-'):
+        # polling clients, only errors are logged
+        pass
+
+    def _accepts_gzip(self):
+        for coding in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = coding.partition(';')
+            if name.strip().lower() in ('gzip', '*'):
+                try:
+                    return float(params.partition('q=')[2] or 1) > 0
+                except ValueError:
+                    return False
+        return False
+
+    def _not_modified(self, guide, etag):
+        if (match := self.headers.get('If-None-Match')) is not None:
+            tags = {tag.strip().removeprefix('W/') for tag in match.split(',')}
+            return '*' in tags or etag in tags
+        if (since := self.headers.get('If-Modified-Since')) is not None:
+            try:
+                return parsedate_to_datetime(since).timestamp() >= guide.mtime
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send(self, body):
+        # guides dict is replaced (never changed) after conversion
+        guides = self.server.guides
+        name = self.path.partition('?')[0].strip('/')
+        guide = guides.get(name) if name else next(iter(guides.values()), None)
+        if guide is None:
+            self.send_error(404 if guides else 503)
+            return
+        if guide.gzip is not None and self._accepts_gzip():
+            data, etag = guide.gzip, guide.gzip_etag
+        else:
+            data, etag = guide.data, guide.etag
+        status = 304 if self._not_modified(guide, etag) else 200
+        self.send_response(status)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', guide.last_modified)
+        self.send_header('Cache-Control', 'no-cache')
+        if guide.gzip is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+        if status == 304:
+            self.end_headers()
+            return
+        self.send_header('Content-Type', guide.content_type)
+        if data is guide.gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
 
 
 def split(s):
@@ -149,21 +1572,303 @@ def split(s):
     return options
 
 
-def main(argv=None):
+def profile_type(s):
+    """Parse output profile "OPT,[OPT]...:PATH", returns (options, path)."""
+    options, sep, path = s.partition(':')
+    if not sep or not path:
+        raise ValueError(f'Profile needs OPTIONS:PATH: {s!r}')
+    return split(options), Path(path)
+
+
+def window_type(s):
+    """Parse time window "FROM,TO", ex. "-6h,+3d", relative to now, empty for open."""
+    units = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+    window = []
+    for part in s.split(','):
+        part = part.strip()
+        if not part:
+            window.append(None)
+        elif (r := re.fullmatch(r'([+-]?\d+)([mhd])', part)) is not None:
+            window.append(timedelta(**{units[r[2]]: int(r[1])}))
+        else:
+            raise ValueError(f'Unknown time offset {part!r}')
+    if len(window) != 2:
+        raise ValueError(f'Time window needs FROM,TO: {s!r}')
+    return tuple(window)
+
+
+def address_type(s):
+    """Parse "[HOST:]PORT", returns (host, port)."""
+    host, _, port = s.rpartition(':')
+    return host.strip('[]'), int(port)
+
+
+def arg_parser():
     p = argparse.ArgumentParser()
-    p.add_argument('path', metavar='PATH', type=Path, help='path to EPG XML base file')
-    p.add_argument('--output', '-o', metavar='PATH', type=Path, help='output path')
-    p.add_argument('--convert', '-c', metavar='OPT,[OPT]...', type=split, default=Converter.OPTIONS,
-                   help='what to convert: %s' % ', '.join(Converter.OPTIONS))
+    p.add_argument('path', metavar='PATH', type=Path, nargs='*',
+                   help='path to EPG XML base file (could be .gz, .xz, .bz2), more files are merged'
+                   ' (the first wins)')
+    p.add_argument('--output', '-o', metavar='PATH', type=Path, help='output path (output folder in batch mode)')
+    p.add_argument('--convert', '-c', metavar='OPT,[OPT]...', type=split, default=Converter.DEFAULT_OPTIONS,
+                   help='what to convert: %s [%s]' % (', '.join(Converter.OPTIONS),
+                                                      ','.join(Converter.DEFAULT_OPTIONS)))
     p.add_argument('--local-timezone', '-t', metavar='TIMEZONE', help='local time zone (ex. +01:00)')
+    p.add_argument('--stream', action='store_true', help='constant memory mode, process element by element')
+    p.add_argument('--sort', action='store_true', help='sort programmes by channel and start in each category')
+    p.add_argument('--shortcuts', metavar='PATH', type=Path,
+                   help='shortcut registry (JSON), keeps the same icon IDs between runs and feeds')
+    p.add_argument('--overlap', choices=Converter.OVERLAP_MODES, default='trim',
+                   help='overlapping programmes (overlap option): trim the previous one or flag (overlap="1")'
+                   ' the next one [trim]')
+    p.add_argument('--dict-min', metavar='COUNT', type=int, default=4,
+                   help='minimal number of text occurrences to put it in dictionary (dict option) [4]')
+    p.add_argument('--format', '-f', choices=Converter.FORMATS,
+                   help='output format [by output extension: .sqlite, .sqlite3, .db or xml]')
+    p.add_argument('--index', action='store_true',
+                   help='write sidecar byte-offset index (OUTPUT.idx) for random access, see epgindex.py')
+    p.add_argument('--compress', '-z', choices=(*COMPRESSIONS, 'none'),
+                   help='output compression [by output extension]')
+    p.add_argument('--compress-level', metavar='LEVEL', type=int, help='output compression level')
+    p.add_argument('--channels', metavar='PATH', type=Path, help='channel ID allowlist file, one ID in line')
+    p.add_argument('--window', metavar='FROM,TO', type=window_type,
+                   help='keep programmes in time window relative to now, ex. --window=-6h,+3d'
+                   ' ("=" is needed, value starts with "-")')
+    p.add_argument('--state', metavar='PATH', type=Path,
+                   help='incremental conversion state file, only changed channels are converted (implies --stream)')
+    p.add_argument('--profile', '-p', metavar='OPT,[OPT]...:PATH', type=profile_type, action='append',
+                   help='output profile, options and output path, input is parsed once for all profiles'
+                   ' (could be used many times, --convert and --output are ignored)')
+    p.add_argument('--stats', action='store_true',
+                   help='print stage stats: wall and CPU time, touched elements, RSS delta'
+                   ' (with --profile only the parsing stages)')
+    p.add_argument('--stats-json', metavar='PATH', help='write stage stats to JSON file ("-" for stdout)')
+    p.add_argument('--stats-profile', metavar='PATH',
+                   help='write cProfile stats of the hottest stage (see pstats), all stages are profiled')
+    p.add_argument('--serve', metavar='[HOST:]PORT', type=address_type,
+                   help='daemon: convert on source change and serve the output(s) over HTTP from memory')
+    p.add_argument('--watch-interval', metavar='SECONDS', type=float, default=10,
+                   help='source check interval in --serve mode [10]')
+    p.add_argument('--batch', metavar='PATH', type=Path,
+                   help='convert all XML files in folder or all feeds from JSON manifest, on process pool')
+    p.add_argument('--jobs', '-j', metavar='NUM', type=int, help='number of batch workers [CPU count]')
+    return p
+
+
+def convert(args):
+    """Convert single file. Returns report."""
+    start = time.perf_counter()
+    channels = None if args.channels is None else load_channels(args.channels)
+    if args.profile and args.state:
+        raise ValueError('Incremental conversion does not work with profiles')
+    profiles = args.profile or [(args.convert, args.output)]
+    stats = None
+    if args.stats or args.stats_json or args.stats_profile:
+        stats = Stats(profile=args.stats_profile is not None)
+    options = dict(local=args.local_timezone, sort=args.sort, shortcuts=Shortcuts(args.shortcuts),
+                   dict_min=args.dict_min, compress=args.compress, compress_level=args.compress_level,
+                   channels=channels, window=args.window, format=args.format, index=args.index,
+                   overlap=args.overlap)
+    converters = [Converter(args.path, output=output, options=opts, state=args.state, **options)
+                  for opts, output in profiles]
+    if args.profile:
+        # shared stages are done once, in the parsing converter
+        shared = set.intersection(*(c.options for c in converters)) & Converter.SHARED_OPTIONS
+        converter = Converter(args.path, options=shared, stats=stats, **options)
+        if args.stream:
+            converter.stream_profiles(converters)
+        else:
+            converter.process_profiles(converters)
+    else:
+        converters[0].stats = stats
+        if args.stream or args.state:
+            converters[0].stream()
+        else:
+            converters[0].run()
+    converter = converters[0]
+    report = {
+        'path': ', '.join(map(str, converter.paths)),
+        'output': ', '.join(str(c.output) for c in converters),
+        'time': time.perf_counter() - start,
+        'size_before': sum(map(file_size, converter.paths)),
+        'size_after': sum(file_size(c.output) for c in converters),
+        'raw_before': converter.input_size,
+        'raw_after': sum(c.output_size or 0 for c in converters) if args.profile else converter.output_size,
+        'outputs': [{'output': str(c.output), 'size_after': file_size(c.output), 'raw_after': c.output_size}
+                    for c in converters],
+        'pruned': converter.pruned,
+        'duplicates': converter.duplicates,
+        'reused': converter.reused,
+        'converted': converter.converted,
+        'overlaps': dict(converter.overlaps),
+        'peak_memory': peak_memory(),
+    }
+    if stats is not None:
+        report['stats'] = stats.as_dict()
+        report['stats']['overlaps'] = report['overlaps']
+        if args.stats_profile:
+            report['stats']['profile'] = stats.dump_profile(args.stats_profile)
+        if args.stats_json == '-':
+            print(json.dumps(report['stats'], indent=1))
+        elif args.stats_json:
+            with open(args.stats_json, 'w') as f:
+                json.dump(report['stats'], f, indent=1)
+    return report
+
+
+def _convert_job(args):
+    """Batch worker, never raises."""
+    try:
+        return convert(args)
+    except Exception as exc:
+        return {'path': ', '.join(map(str, args.path)), 'error': f'{type(exc).__name__}: {exc}'}
+
+
+def batch_jobs(p, args):
+    """Return args for all batch feeds. Feed options override command line options."""
+    def job(path, output=None, **options):
+        paths = [path] if isinstance(path, str) else path
+        argv = [str(base / path) for path in paths]
+        if output is not None:
+            argv += ['--output', str(base / output)]
+        elif args.output is not None:
+            argv += ['--output', str(args.output / Path(paths[0]).name)]
+        for key, value in options.items():
+            if value is True:
+                argv.append(f'--{key}')
+            elif value is not False and value is not None:
+                argv += [f'--{key}', str(value)]
+        return p.parse_args(argv, namespace=copy(defaults))
+
+    defaults = copy(args)
+    defaults.batch = defaults.output = None
+    base = args.batch if args.batch.is_dir() else args.batch.parent
+    if args.output is not None and args.output.resolve() == base.resolve():
+        p.error('--output folder has to be different from the batch input folder')
+    if args.batch.is_dir():
+        # skip default outputs ("NAME.new.xml") of the previous runs
+        return [job(path.name) for path in sorted(args.batch.iterdir())
+                if path.is_file() and path.name.endswith(('.xml', *(f'.xml.{ext}' for ext in COMPRESSIONS)))
+                and '.new.' not in path.name]
+    with open(args.batch) as f:
+        manifest = json.load(f)
+    if isinstance(manifest, dict):
+        manifest = manifest.get('feeds', [])
+    return [job(feed) if isinstance(feed, str) else job(**feed) for feed in manifest]
+
+
+def batch(p, args):
+    """Convert many feeds on process pool, print report."""
+    jobs = batch_jobs(p, args)
+    if args.output is not None:
+        args.output.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    # new process for every feed, peak memory is per feed
+    with Pool(args.jobs, maxtasksperchild=1) as pool:
+        reports = pool.map(_convert_job, jobs, chunksize=1)
+    total = time.perf_counter() - start
+    width = max((len(r['path']) for r in reports), default=4)
+    print(f'{"Feed":{width}}  {"Time":>8}  {"Before":>10}  {"After":>10}  {"Size":>4}  {"Peak RSS":>10}')
+    for r in reports:
+        if 'error' in r:
+            print(f'{r["path"]:{width}}  ERROR {r["error"]}')
+            continue
+        peak = '---' if r['peak_memory'] is None else human_size(r['peak_memory'])
+        print(f'{r["path"]:{width}}  {r["time"]:7.2f}s  {human_size(r["size_before"]):>10}'
+              f'  {human_size(r["size_after"]):>10}  {100 * r["size_after"] / (r["size_before"] or 1):3.0f}%'
+              f'  {peak:>10}')
+    done = [r for r in reports if 'error' not in r]
+    before, after = sum(r['size_before'] for r in done), sum(r['size_after'] for r in done)
+    print(f'Converted {len(done)}/{len(reports)} feeds in {total:.2f}s'
+          f' (sum {sum(r["time"] for r in done):.2f}s),'
+          f' {human_size(before)} -> {human_size(after)} ({100 * after / (before or 1):.0f}%)')
+    return reports
+
+
+def source_signature(paths):
+    """Return sources state (mtime, size), None for missing file."""
+    signature = []
+    for path in paths:
+        try:
+            st = path.stat()
+        except OSError:
+            signature.append(None)
+        else:
+            signature.append((st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def serve(args):
+    """Watch sources, convert on change (never on request) and serve outputs from memory."""
+    host, port = args.serve
+    server = ThreadingHTTPServer((host, port), GuideHandler)
+    server.daemon_threads = True
+    server.guides = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f'Serving on http://{host or "0.0.0.0"}:{server.server_port}/', flush=True)
+    # converted sources and the last seen sources (changed file has to be stable for one interval)
+    done = pending = None
+    # new process for every conversion, the daemon keeps only the output bytes
+    with Pool(1, maxtasksperchild=1) as pool:
+        try:
+            while True:
+                signature = source_signature(args.path)
+                if signature != done and None not in signature and (done is None or signature == pending):
+                    report = pool.apply(_convert_job, (args,))
+                    done = signature
+                    if 'error' in report:
+                        print(f'{time.strftime("%F %T")} ERROR {report["error"]}', file=sys.stderr, flush=True)
+                    else:
+                        guides = {}
+                        for output in report['outputs']:
+                            guide = Guide(output['output'])
+                            guides[guide.path.name] = guide
+                        server.guides = guides
+                        print(f'{time.strftime("%F %T")} Converted in {report["time"]:.2f}s:'
+                              f' {", ".join(guides)}', flush=True)
+                pending = signature
+                time.sleep(args.watch_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def main(argv=None):
+    p = arg_parser()
     args = p.parse_args(argv)
-    converter = Converter(args.path, output=args.output, options=args.convert, local=args.local_timezone)
-    converter.load()
-    converter.process()
-    converter.write()
-    size_before = file_size(converter.path)
-    size_after = file_size(converter.output)
-    print(f'File is {human_size(size_before - size_after)} smaller ({100 * size_after / (size_before or 1):.0f}%)')
+    if args.batch is not None:
+        batch(p, args)
+        return
+    if not args.path:
+        p.error('PATH or --batch is required')
+    if args.serve is not None:
+        serve(args)
+        return
+    report = convert(args)
+    if report['pruned']:
+        print(f'Dropped {report["pruned"]} elements (channels, time window)')
+    if report['duplicates']:
+        print(f'Dropped {report["duplicates"]} duplicates (merge)')
+    if overlaps := report['overlaps']:
+        print(f'Programmes: {overlaps.get("duplicate", 0)} duplicates dropped, {overlaps.get("trimmed", 0)} trimmed,'
+              f' {overlaps.get("flagged", 0)} flagged, {overlaps.get("dropped", 0)} dropped (overlap)')
+    if report['reused']:
+        print(f'Reused {report["reused"]} of {report["reused"] + report["converted"]} programme blocks')
+    size_before, raw_before = report['size_before'], report['raw_before']
+    for output in report['outputs']:
+        size_after, raw_after = output['size_after'], output['raw_after']
+        if args.profile:
+            print(f'{output["output"]}:')
+        if raw_before != size_before or raw_after != size_after:
+            print(f'Data is {human_size(raw_before - raw_after)} smaller ({100 * raw_after / (raw_before or 1):.0f}%),'
+                  f' {human_size(raw_before)} -> {human_size(raw_after)}')
+        print(f'File is {human_size(size_before - size_after)} smaller'
+              f' ({100 * size_after / (size_before or 1):.0f}%)')
+    if args.stats:
+        print(Stats.table(report['stats']))
+    if args.stats_profile and report['stats']['profile']:
+        print(f'Profile of {report["stats"]["profile"]} written to {args.stats_profile}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,13 @@
+"""Benchmark of epg-killer on synthetic XMLTV feeds.
+
+Run from `epg/` folder:
+
+    python -m epgbench --sizes 10M,100M --output bench.json
+    python -m epgbench --sizes 10M --compare bench.json
+
+See `python -m epgbench --help`.
+"""
+
+from .generator import Generator, parse_size
+
+__all__ = ['Generator', 'parse_size']
@@ -0,0 +1,187 @@
+"""Run epg-killer benchmark: every converter option and the full pipeline on generated feeds."""
+
+from pathlib import Path
+from datetime import datetime
+from multiprocessing import Pool
+import argparse
+import hashlib
+import importlib.util
+import json
+import platform
+import sys
+from .generator import Generator, parse_size
+
+
+#: Converter script (the module name has a hyphen, it is loaded from the path).
+KILLER = Path(__file__).resolve().parent.parent / 'epg-killer.py'
+
+_killer = None
+
+
+def killer():
+    """Return epg-killer module."""
+    global _killer
+    if _killer is None:
+        spec = importlib.util.spec_from_file_location('epg_killer', KILLER)
+        _killer = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_killer)
+    return _killer
+
+
+def feed(work, size, params):
+    """Generate feed (if not generated yet), returns (path, generator)."""
+    gen = Generator.for_size(parse_size(size), **params)
+    key = hashlib.blake2b(json.dumps(gen.params(), sort_keys=True).encode(), digest_size=6).hexdigest()
+    path = work / f'feed-{size}-{key}.xml'
+    if not path.exists():
+        print(f'Generating {path} ({gen.channels} channels, {gen.programmes} programmes)...', file=sys.stderr)
+        tmp = path.with_name(f'{path.name}.tmp')
+        gen.save(tmp)
+        tmp.replace(path)
+    return path, gen
+
+
+def _run(argv):
+    """Benchmark worker, fresh process for every run (peak RSS is per run)."""
+    ek = killer()
+    return ek.convert(ek.arg_parser().parse_args(argv))
+
+
+def cases(names):
+    """Return dict of benchmark cases: name -> converter options."""
+    ek = killer()
+    all_cases = {opt: {opt} for opt in sorted(ek.Converter.OPTIONS)}
+    all_cases['full'] = ek.Converter.DEFAULT_OPTIONS
+    if names is None:
+        return all_cases
+    return {name: all_cases[name] for name in names}
+
+
+def run(args):
+    """Run all benchmarks, returns results."""
+    params = {'per_day': args.per_day, 'days': args.days, 'icons': args.icons, 'categories': args.categories,
+              'timezones': args.timezones, 'seed': args.seed}
+    args.work.mkdir(parents=True, exist_ok=True)
+    output = args.work / 'output.xml'
+    results = []
+    with Pool(1, maxtasksperchild=1) as pool:
+        for size in args.sizes:
+            path, gen = feed(args.work, size, params)
+            for mode in args.modes:
+                for name, options in cases(args.cases).items():
+                    argv = [str(path), '--output', str(output), '--convert', ','.join(sorted(options))]
+                    if mode == 'stream':
+                        argv.append('--stream')
+                    report = pool.apply(_run, (argv,))
+                    result = {
+                        'size': size,
+                        'mode': mode,
+                        'case': name,
+                        'options': sorted(options),
+                        'input_size': report['size_before'],
+                        'output_size': report['size_after'],
+                        'programmes': gen.programmes,
+                        'time': report['time'],
+                        'programmes_per_s': gen.programmes / report['time'],
+                        'peak_memory': report['peak_memory'],
+                    }
+                    results.append(result)
+                    print_result(result)
+    output.unlink(missing_ok=True)
+    return {
+        'version': 1,
+        'created': f'{datetime.now():%Y-%m-%d %H:%M:%S}',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'killer': killer().__version__,
+        'generator': params,
+        'results': results,
+    }
+
+
+def _mb(size):
+    return '---' if size is None else f'{size / 1024 ** 2:.1f}M'
+
+
+def print_result(r, base=None):
+    line = (f'{r["size"]:>5} {r["mode"]:6} {r["case"]:9} {r["time"]:8.2f}s {r["programmes_per_s"]:10.0f} p/s'
+            f' {_mb(r["peak_memory"]):>9}')
+    if base is not None:
+        line += f'  time {100 * r["time"] / base["time"]:4.0f}%'
+        if r['peak_memory'] and base['peak_memory']:
+            line += f'  RSS {100 * r["peak_memory"] / base["peak_memory"]:4.0f}%'
+    print(line)
+
+
+def compare(data, base, threshold):
+    """Print comparison with previous results, returns number of regressions (slower than threshold)."""
+    previous = {(r['size'], r['mode'], r['case']): r for r in base['results']}
+    regressions = 0
+    print(f'Compared with {base.get("created")} (Python {base.get("python")}, epg-killer {base.get("killer")})')
+    for r in data['results']:
+        old = previous.get((r['size'], r['mode'], r['case']))
+        if old is None:
+            continue
+        print_result(r, old)
+        if r['time'] > old['time'] * (1 + threshold):
+            regressions += 1
+    if regressions:
+        print(f'{regressions} regression(s), more than {100 * threshold:.0f}% slower')
+    return regressions
+
+
+def arg_parser():
+    p = argparse.ArgumentParser(prog='epgbench', description=__doc__)
+    p.add_argument('--sizes', metavar='SIZE,[SIZE]...', type=lambda s: s.split(','), default=['10M', '100M', '1G'],
+                   help='feed sizes [10M,100M,1G]')
+    p.add_argument('--modes', metavar='MODE,[MODE]...', type=lambda s: s.split(','), default=['tree', 'stream'],
+                   help='converter modes: tree, stream [tree,stream]')
+    p.add_argument('--cases', metavar='CASE,[CASE]...', type=lambda s: s.split(','),
+                   help='converter options to run alone or "full" (default options) [all]')
+    p.add_argument('--work', metavar='PATH', type=Path, default=Path('bench-work'),
+                   help='folder for generated feeds, kept between runs [bench-work]')
+    p.add_argument('--output', '-o', metavar='PATH', type=Path, help='write results to JSON file')
+    p.add_argument('--compare', metavar='PATH', type=Path, help='compare with previous results (JSON)')
+    p.add_argument('--threshold', metavar='RATIO', type=float, default=0.1,
+                   help='time regression threshold for --compare, exit code is 1 if exceeded [0.1]')
+    g = p.add_argument_group('generator')
+    g.add_argument('--per-day', metavar='NUM', type=int, default=24, help='programmes per channel and day [24]')
+    g.add_argument('--days', metavar='NUM', type=int, default=7, help='number of days [7]')
+    g.add_argument('--icons', metavar='NUM', type=int, default=10, help='number of icon URL bases [10]')
+    g.add_argument('--categories', metavar='NUM', type=int, default=20, help='number of categories [20]')
+    g.add_argument('--timezones', metavar='TZ,[TZ]...', type=lambda s: s.split(','), default=['+0100', '+0200'],
+                   help='timezone mix [+0100,+0200]')
+    g.add_argument('--seed', type=int, default=1, help='random seed [1]')
+    g.add_argument('--generate', metavar='PATH', type=Path,
+                   help='only generate the feed of the first size to PATH and exit')
+    return p
+
+
+def main(argv=None):
+    p = arg_parser()
+    args = p.parse_args(argv)
+    if args.cases is not None and (unknown := set(args.cases) - set(cases(None))):
+        p.error(f'Unknown cases: {", ".join(sorted(unknown))}')
+    if unknown := set(args.modes) - {'tree', 'stream'}:
+        p.error(f'Unknown modes: {", ".join(sorted(unknown))}')
+    if args.generate is not None:
+        gen = Generator.for_size(parse_size(args.sizes[0]), per_day=args.per_day, days=args.days, icons=args.icons,
+                                 categories=args.categories, timezones=args.timezones, seed=args.seed)
+        gen.save(args.generate)
+        print(f'{args.generate}: {gen.channels} channels, {gen.programmes} programmes')
+        return 0
+    base = None
+    if args.compare is not None:
+        with open(args.compare) as f:
+            base = json.load(f)
+    data = run(args)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=1)
+    if base is not None and compare(data, base, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
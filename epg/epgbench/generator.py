@@ -0,0 +1,136 @@
+"""Deterministic synthetic XMLTV feed generator."""
+
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape, quoteattr
+import io
+import random
+import re
+
+
+def parse_size(s):
+    """Parse size like "10M", "1.5G" or "2048" (bytes)."""
+    r = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*', s, re.IGNORECASE)
+    if r is None:
+        raise ValueError(f'Unknown size {s!r}')
+    return int(float(r[1]) * 1024 ** ' KMG'.index(r[2].upper() or ' '))
+
+
+class Generator:
+    """Synthetic XMLTV feed, the same for the same parameters (and seed).
+
+    Every channel is generated from own random generator, so channels do not depend on each other
+    and the feed size is (almost) linear in number of channels.
+    """
+
+    WORDS = ('film', 'serial', 'odcinek', 'magazyn', 'program', 'wiadomości', 'sport', 'mecz', 'koncert',
+             'dokument', 'historia', 'przyroda', 'kuchnia', 'podróże', 'teleturniej', 'bajka', 'kabaret',
+             'reportaż', 'wywiad', 'muzyka', 'pogoda', 'relacja', 'premiera', 'powtórka')
+
+    def __init__(self, *, channels=100, per_day=24, days=7, icons=10, categories=20, timezones=('+0100', '+0200'),
+                 seed=1, start=datetime(2023, 10, 28)):
+        #: Number of channels.
+        self.channels = channels
+        #: Programmes per channel per day.
+        self.per_day = per_day
+        #: Number of days.
+        self.days = days
+        #: Number of different icon URL bases (hosts and paths), icon diversity.
+        self.icons = icons
+        #: Number of different categories.
+        self.categories = categories
+        #: Timezone offsets mix, every programme takes random one.
+        self.timezones = tuple(timezones)
+        self.seed = seed
+        #: First programme start (UTC).
+        self.start = start
+        self._offsets = [timedelta(minutes=(-1 if tz[0] == '-' else 1) * (int(tz[1:3]) * 60 + int(tz[3:5])))
+                         for tz in self.timezones]
+
+    @property
+    def programmes(self):
+        """Number of generated programmes."""
+        return self.channels * self.per_day * self.days
+
+    def params(self):
+        """Generator parameters (JSON ready)."""
+        return {'channels': self.channels, 'per_day': self.per_day, 'days': self.days, 'icons': self.icons,
+                'categories': self.categories, 'timezones': list(self.timezones), 'seed': self.seed,
+                'start': f'{self.start:%Y-%m-%d %H:%M}'}
+
+    @classmethod
+    def for_size(cls, size, **params):
+        """Generator with number of channels to get feed of about `size` bytes."""
+        params.pop('channels', None)
+        sample = cls(channels=1, **params)
+        f = io.StringIO()
+        sample._write_channel(f, 0)
+        sample._write_programmes(f, 0)
+        per_channel = len(f.getvalue().encode('utf-8'))
+        return cls(channels=max(1, round(size / per_channel)), **params)
+
+    def write(self, f):
+        """Write feed to text file."""
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE tv SYSTEM "xmltv.dtd">\n')
+        f.write('<tv generator-info-name="epgbench">\n')
+        for i in range(self.channels):
+            self._write_channel(f, i)
+        for i in range(self.channels):
+            self._write_programmes(f, i)
+        f.write('</tv>\n')
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            self.write(f)
+
+    def _random(self, i, kind):
+        return random.Random(f'{self.seed}:{kind}:{i}')
+
+    def _text(self, rnd, words):
+        return ' '.join(rnd.choice(self.WORDS) for _ in range(words)).capitalize()
+
+    def _icon(self, rnd, name):
+        base = rnd.randrange(self.icons)
+        return f'http://img{base}.example.com/epg/{base}/{name}.jpg'
+
+    def _write_channel(self, f, i):
+        rnd = self._random(i, 'channel')
+        f.write(f'  <channel id="ch{i}.pl">\n'
+                f'    <display-name lang="pl">{escape(self._text(rnd, 2))} {i}</display-name>\n'
+                f'    <icon src={quoteattr(self._icon(rnd, f"logo{i}"))}/>\n'
+                f'  </channel>\n')
+
+    def _write_programmes(self, f, i):
+        rnd = self._random(i, 'programme')
+        channel = f'ch{i}.pl'
+        # series, titles are repeated (dict option)
+        titles = [self._text(rnd, rnd.randint(1, 4)) for _ in range(max(1, self.per_day // 2))]
+        step = timedelta(days=1) / self.per_day
+        start = self.start
+        for n in range(self.per_day * self.days):
+            stop = self.start + step * (n + 1)
+            k = rnd.randrange(len(self.timezones))
+            tz, offset = self.timezones[k], self._offsets[k]
+            f.write(f'  <programme start="{start + offset:%Y%m%d%H%M%S} {tz}"'
+                    f' stop="{stop + offset:%Y%m%d%H%M%S} {tz}" channel="{channel}">\n'
+                    f'    <title lang="pl">{escape(rnd.choice(titles))}</title>\n')
+            if rnd.random() < 0.5:
+                f.write(f'    <sub-title lang="pl">{escape(self._text(rnd, 3))}</sub-title>\n')
+            f.write(f'    <desc lang="pl">{escape(self._text(rnd, rnd.randint(5, 30)))} &amp; więcej.</desc>\n')
+            if rnd.random() < 0.3:
+                f.write('    <credits>\n')
+                for _ in range(rnd.randint(1, 4)):
+                    role, name = quoteattr(self._text(rnd, 1)), escape(self._text(rnd, 2))
+                    f.write(f'      <actor role={role}>{name}</actor>\n')
+                f.write('    </credits>\n')
+            if self.categories:
+                f.write(f'    <category lang="pl">Kategoria {rnd.randrange(self.categories)}</category>\n')
+            if rnd.random() < 0.7:
+                f.write(f'    <icon src={quoteattr(self._icon(rnd, f"{i}_{n}"))}/>\n')
+            if rnd.random() < 0.4:
+                episode = f'{rnd.randrange(10)}.{rnd.randrange(30)}.'
+                f.write(f'    <episode-num system="xmltv_ns">{episode}</episode-num>\n')
+            if rnd.random() < 0.3:
+                f.write(f'    <rating system="PL">\n      <value>{rnd.choice((7, 12, 16, 18))}</value>\n'
+                        f'    </rating>\n')
+            f.write('  </programme>\n')
+            start = stop
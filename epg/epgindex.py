@@ -0,0 +1,85 @@
+"""Random access to epg-killer output, with sidecar index (epg-killer.py --index).
+
+Only one channel is parsed, the output is mapped in memory and the channel slices are cut from it.
+
+    with GuideIndex('guide.new.xml') as guide:
+        for prog in guide.programmes('TVP1.pl', start='20231028180000', stop='20231028230000'):
+            print(prog.get('start'), prog.findtext('title'))
+"""
+
+from pathlib import Path
+import json
+import mmap
+from lxml import etree
+
+
+class GuideIndex:
+    """Converted XMLTV guide with sidecar byte-offset index."""
+
+    def __init__(self, path, index=None):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(f'{self.path.name}.idx') if index is None else Path(index)
+        with open(self.index_path, encoding='utf-8') as f:
+            self.index = json.load(f)
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) != self.index['size']:
+            self.close()
+            raise ValueError(f'Index {self.index_path} does not match {self.path}')
+        self._parser = etree.XMLParser(remove_blank_text=True)
+        self._shortcuts = None
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _fragment(self, offset, length):
+        """Parse slice of the guide, returns dummy root with all slice elements."""
+        data = self._map[offset:offset + length]
+        return etree.fromstring(b'<slice>' + data + b'</slice>', self._parser)
+
+    def channels(self):
+        """Return list of channel IDs."""
+        return list(self.index['nodes'])
+
+    def channel(self, cid):
+        """Return channel node or None."""
+        try:
+            offset, length = self.index['nodes'][cid]
+        except KeyError:
+            return None
+        return self._fragment(offset, length)[0]
+
+    def shortcuts(self):
+        """Return dict of shortcuts (ID -> value)."""
+        if self._shortcuts is None:
+            offset, length = self.index['shortcuts']
+            self._shortcuts = {}
+            if length:
+                for node in self._fragment(offset, length).iterfind('./shortcuts/short'):
+                    self._shortcuts[node.get('id')] = node.get('value')
+        return self._shortcuts
+
+    def programmes(self, cid, *, start=None, stop=None):
+        """Yield channel programmes, optionally only in time range [start, stop).
+
+        Times are compared as strings, in output format (ex. "YYYYmmddHHMMSS" after timezone conversion).
+        Programmes from grouped output (category option) get `category` attribute with the group name.
+        """
+        for offset, length, first, last, group in self.index['channels'].get(cid, ()):
+            if (stop is not None and first >= stop) or (start is not None and last and last <= start):
+                continue
+            for node in self._fragment(offset, length):
+                if stop is not None and (node.get('start') or '') >= stop:
+                    continue
+                if start is not None and (node.get('stop') or node.get('start') or '') <= start:
+                    continue
+                if group is not None:
+                    node.set('category', group)
+                yield node
@@ -0,0 +1,189 @@
+"""Constant memory reader of epg-killer output (compact format).
+
+Yields channels and programmes as standard XMLTV elements: shortcuts (icons and `dict` texts) are expanded,
+`name`/`prog` tags, category groups and local timestamps are converted back.
+
+    reader = GuideReader('guide.new.xml')
+    for node in reader.programmes():
+        print(node.get('channel'), node.get('start'), node.findtext('title'))
+
+Yielded element is valid until the next one is read (it is cleared to keep memory flat), copy it if needed.
+"""
+
+from datetime import datetime, timedelta
+import re
+import gzip
+import lzma
+import bz2
+from lxml import etree
+
+
+_MAGIC = ((b'\x1f\x8b', gzip.open), (b'\xfd7zXZ\x00', lzma.open), (b'BZh', bz2.open))
+
+
+def open_input(path):
+    """Open file for binary read, decompress on the fly (by magic bytes, as converter output could be)."""
+    with open(path, 'rb') as f:
+        head = f.read(6)
+    for sig, opener in _MAGIC:
+        if head.startswith(sig):
+            return opener(path, 'rb')
+    return open(path, 'rb')
+
+
+class GuideReader:
+    """Iterate over compact guide, element by element."""
+
+    #: Attributes could be `dict` references (see Converter.DICT_ATTRS).
+    DICT_ATTRS = ('system', 'role')
+
+    _RE_ICON = re.compile(r'\{(?P<id>[0-9a-f]+)\}/(?P<name>.*)', re.DOTALL)
+    #: Read size of shortcuts scan (see `_scan_shortcuts()`).
+    SCAN_CHUNK = 1024 * 1024
+
+    _RE_REF = re.compile(r'\{(?P<id>[0-9a-f]+)\}')
+
+    #: Elements with "lang" attribute (XMLTV DTD), restored from the root if removed by converter.
+    LANG_TAGS = frozenset(('display-name', 'title', 'sub-title', 'desc', 'category', 'keyword', 'language',
+                           'orig-language', 'country', 'premiere', 'last-chance'))
+
+    #: Programme sub-elements after <category> (XMLTV DTD order), grouped category is inserted before them.
+    AFTER_CATEGORY = frozenset(('category', 'keyword', 'language', 'orig-language', 'length', 'icon', 'url',
+                                'country', 'episode-num', 'video', 'audio', 'previously-shown', 'premiere',
+                                'last-chance', 'new', 'subtitles', 'rating', 'star-rating', 'review', 'image'))
+
+    def __init__(self, source, *, local=None):
+        #: Path (plain, gz, xz or bz2) or binary seekable file object.
+        self.source = source
+        if local is None:
+            t = 86400  # one day (the same as converter)
+            local = datetime.fromtimestamp(t) - datetime.utcfromtimestamp(t)
+        elif isinstance(local, str):
+            local = datetime.strptime(local, '%z').tzinfo.utcoffset(None)
+        minutes = round(local / timedelta(minutes=1))
+        #: Local timezone used by converter, as XMLTV offset.
+        self.offset = f'{"-" if minutes < 0 else "+"}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}'
+        #: Shortcuts, known after <shortcuts> block is read (see `_scan_shortcuts()`).
+        self.shortcuts = {}
+        #: Guide language (root "lang"), default for all texts.
+        self.lang = None
+
+    def _short(self, sid, default):
+        return self.shortcuts.get(sid, default)
+
+    def _expand(self, value):
+        """Expand whole value reference (`dict` option)."""
+        if value and value[0] == '{' and (r := self._RE_REF.fullmatch(value)):
+            return self._short(r['id'], value)
+        return value
+
+    def _timestamp(self, value):
+        if value and ' ' not in value:
+            return f'{value} {self.offset}'
+        return value
+
+    def _convert(self, node, category=None):
+        """Convert element to standard XMLTV in place."""
+        if node.tag == 'prog':
+            node.tag = 'programme'
+        if node.tag == 'programme':
+            for attr in ('start', 'stop'):
+                if value := node.get(attr):
+                    node.set(attr, self._timestamp(value))
+        for sub in node.iterdescendants(etree.Element):
+            if sub.tag == 'name' and node.tag == 'channel':
+                sub.tag = 'display-name'
+            elif sub.tag == 'icon' and (src := sub.get('src')) and (r := self._RE_ICON.fullmatch(src)):
+                if (url := self.shortcuts.get(r['id'])) is not None:
+                    sub.set('src', f'{url}/{r["name"]}')
+            if len(sub) == 0 and sub.text:
+                sub.text = self._expand(sub.text)
+            for attr in self.DICT_ATTRS:
+                if value := sub.get(attr):
+                    sub.set(attr, self._expand(value))
+        if category is not None:
+            sub = etree.Element('category')
+            sub.text = category
+            pos = next((i for i, child in enumerate(node) if child.tag in self.AFTER_CATEGORY), len(node))
+            node.insert(pos, sub)
+        if self.lang is not None:
+            for sub in node.iterdescendants(*self.LANG_TAGS):
+                if sub.get('lang') is None:
+                    sub.set('lang', self.lang)
+        return node
+
+    def __iter__(self):
+        """Yield all channels and programmes (as standard XMLTV elements)."""
+        if hasattr(self.source, 'read'):
+            pos = self.source.tell()
+            self._scan_shortcuts(self.source)
+            self.source.seek(pos)
+            yield from self._iter(self.source)
+            return
+        with open_input(self.source) as f:
+            self._scan_shortcuts(f)
+        with open_input(self.source) as f:
+            yield from self._iter(f)
+
+    def _scan_shortcuts(self, f):
+        """Find and read <shortcuts> block before parsing.
+
+        Tree mode writes it at the beginning (found at once), stream mode at the end (known only there),
+        raw bytes are searched (no parsing), "<" is always escaped in XML texts and attributes.
+        """
+        begin, end = b'<shortcuts>', b'</shortcuts>'
+        data = b''
+        found = False
+        while chunk := f.read(self.SCAN_CHUNK):
+            data += chunk
+            if not found:
+                if (pos := data.find(begin)) < 0:
+                    data = data[-len(begin):]
+                    continue
+                data, found = data[pos:], True
+            if (pos := data.find(end)) >= 0:
+                node = etree.fromstring(data[:pos + len(end)])
+                self.shortcuts.update((short.get('id'), short.get('value')) for short in node)
+                return
+
+    def _iter(self, source):
+        context = etree.iterparse(source, events=('start', 'end'), remove_blank_text=True)
+        _, root = next(context)
+        self.lang = root.get('lang')
+        depth = 1
+        group = category = None
+        for event, node in context:
+            if event == 'start':
+                depth += 1
+                if depth == 2 and node.tag == 'category':
+                    group, category = node, self._expand(node.get('category'))
+                continue
+            depth -= 1
+            if depth == 1:
+                if node.tag == 'shortcuts':
+                    self.shortcuts.update((short.get('id'), short.get('value')) for short in node)
+                elif node is not group:
+                    yield self._convert(node)
+                group = category = None
+            elif depth == 2 and group is not None:
+                yield self._convert(node, category)
+            else:
+                continue
+            # free already read elements
+            node.clear()
+            parent = node.getparent()
+            while node.getprevious() is not None:
+                del parent[0]
+
+    def channels(self):
+        """Yield channels only, stop at the first programme (channels are at the beginning)."""
+        for node in self:
+            if node.tag != 'channel':
+                break
+            yield node
+
+    def programmes(self):
+        """Yield programmes only."""
+        for node in self:
+            if node.tag == 'programme':
+                yield node
@@ -0,0 +1,94 @@
+"""Label merge micro-benchmark: indexed LabelList vs previous linear scan.
+
+    python benchmarks/labels.py [--sizes 1000,10000,100000] [--texts 100]
+
+Labels share a small set of texts (like "Enabled" in many settings), every text has many IDs
+(mostly from strings.po), so the linear scan cost grows with number of labels.
+"""
+
+from pathlib import Path
+import argparse
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import kolang  # noqa: E402
+
+
+class LinearLabelList(list):
+    """Previous implementation (linear scan), reference only."""
+
+    def add(self, label):
+        for lb in self:
+            if lb.id is None and label.id is not None:
+                lb.id = label.id
+            if lb.id == label.id or label.id is None:
+                if not lb.text and label.text:
+                    lb.text = label.text
+                lb.nodes |= label.nodes
+                lb.trans.extend(label.trans)
+                return lb
+        self.append(label)
+        return label
+
+    def set_id(self, label, lid):
+        label.id = lid
+
+    def replace(self, old, new):
+        self[self.index(old)] = new
+
+    def first_other(self, lid):
+        return next((lb for lb in self if lb.id is not None and lb.id != lid), None)
+
+
+def labels(size, texts, seed=1):
+    """Return label (ID, text) list, every ID has always the same text."""
+    rnd = random.Random(seed)
+    result = []
+    known = []  # labels with ID
+    for i in range(size):
+        if known and rnd.random() < 0.1:
+            lid, text = rnd.choice(known)
+        else:
+            text = f'Text {rnd.randrange(texts)}'
+            lid = 30000 + i if rnd.random() < 0.9 else None
+            if lid is not None:
+                known.append((lid, text))
+        result.append((lid, text))
+    return result
+
+
+def run(data, list_class):
+    kolang.LabelList = list_class
+    try:
+        trans = kolang.Translate()
+        start = time.perf_counter()
+        for lid, text in data:
+            trans._add_label(kolang.Label(lid, text))
+        trans.generate()
+        return time.perf_counter() - start, sorted((lb.id, lb.text) for lb in trans._by_id.values())
+    finally:
+        kolang.LabelList = LabelList
+
+
+LabelList = kolang.LabelList
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.partition('\n')[0])
+    p.add_argument('--sizes', type=lambda s: [int(v) for v in s.split(',')], default=[1000, 10000, 100000],
+                   help='number of labels [1000,10000,100000]')
+    p.add_argument('--texts', type=int, default=100, help='number of different texts [100]')
+    args = p.parse_args(argv)
+    print(f'{"Labels":>8}  {"Linear":>9}  {"Indexed":>9}  {"Speedup":>7}')
+    for size in args.sizes:
+        data = labels(size, args.texts)
+        linear, expected = run(data, LinearLabelList)
+        indexed, result = run(data, LabelList)
+        assert result == expected, 'Different merge result'
+        print(f'{size:8}  {linear:8.3f}s  {indexed:8.3f}s  {linear / indexed:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""PO reader/writer benchmark: native (kolang.po) vs polib, with round-trip check.
+
+    python benchmarks/po.py [--sizes 1000,10000,50000] [--check PO_FILE...]
+
+Round-trip check: native parser must give the same entries, metadata and header as polib,
+native writer must give the same text as polib (for polib and native parsed catalog).
+Generated catalogs use Kodi subset: comments, occurrences, flags, long (wrapped) and multi-line
+texts, escapes and obsolete entries.
+"""
+
+from pathlib import Path
+import argparse
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import polib  # noqa: E402
+from kolang.po import read_po, format_po  # noqa: E402
+
+
+WORDS = ('Play', 'Stop', 'Settings', 'Folder', 'Ustawienia', 'Odtwarzaj', 'Über', 'エピソード', '[B]Bold[/B]',
+         '%s', '{name}', 'a-b', 'x' * 30, 'quoted "text"', 'back\\slash', 'tab\there', 'the', 'video', 'list')
+
+
+def _text(rnd, words):
+    text = ' '.join(rnd.choice(WORDS) for _ in range(words))
+    if rnd.random() < 0.05:
+        text += '\n' + _text(rnd, rnd.randint(1, 5))
+    if rnd.random() < 0.02:
+        text += '\n'
+    return text
+
+
+def catalog(size, seed=1):
+    """Return generated PO text (written by polib), `size` entries."""
+    rnd = random.Random(seed)
+    po = polib.POFile()
+    po.header = 'Kodi Media Center language file\nAddon Name: Benchmark\n\nAddon id: plugin.bench'
+    po.metadata = {
+        'Project-Id-Version': '1.0',
+        'PO-Revision-Date': '2023-01-01 12:00+0100',
+        'Language': 'pl_PL',
+        'MIME-Version': '1.0',
+        'Content-Type': 'text/plain; charset=utf-8',
+        'Content-Transfer-Encoding': '8bit',
+        'Plural-Forms': 'nplurals=3; plural=(n==1 ? 0 : n%10>=2 && n%10<=4 && (n%100<10 || n%100>=20) ? 1 : 2);',
+    }
+    for i in range(size):
+        # mostly short labels, some long help texts
+        words = rnd.choice((1, 1, 1, 2, 2, 3, 4)) if rnd.random() < 0.9 else rnd.randint(8, 30)
+        entry = polib.POEntry(
+            msgctxt=f'#{30000 + i}',
+            msgid=_text(rnd, words),
+            msgstr=_text(rnd, words) if rnd.random() < 0.7 else '',
+            obsolete=rnd.random() < 0.1,
+        )
+        if rnd.random() < 0.1:
+            entry.comment = '[empty]'
+        if rnd.random() < 0.05:
+            entry.tcomment = _text(rnd, rnd.randint(1, 20)).replace('\n', ' ')
+        if rnd.random() < 0.05:
+            entry.occurrences = [(f'resources/lib/module-{k}.py', str(rnd.randrange(1000))) for k in range(5)]
+        if rnd.random() < 0.05:
+            entry.flags = ['fuzzy']
+        po.append(entry)
+    return str(po)
+
+
+FIELDS = ('msgctxt', 'msgid', 'msgstr', 'comment', 'tcomment', 'occurrences', 'flags', 'obsolete', 'linenum')
+
+
+def check(path):
+    """Round-trip check of PO file, returns list of errors."""
+    errors = []
+    ref, nat = polib.pofile(str(path)), read_po(path)
+    if (ref.header, ref.metadata, ref.metadata_is_fuzzy) != (nat.header, nat.metadata, nat.metadata_is_fuzzy):
+        errors.append('header or metadata differ')
+    if len(ref) != len(nat):
+        errors.append(f'number of entries differ: {len(ref)} != {len(nat)}')
+    for a, b in zip(ref, nat):
+        if any(getattr(a, f) != getattr(b, f) for f in FIELDS):
+            errors.append(f'entry at line {a.linenum} differs')
+            break
+    text = str(ref)
+    if format_po(ref) != text:
+        errors.append('native writer output differs')
+    if format_po(nat) != text:
+        errors.append('native round-trip output differs')
+    return errors
+
+
+def best(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.partition('\n')[0])
+    p.add_argument('--sizes', type=lambda s: [int(v) for v in s.split(',')], default=[1000, 10000, 50000],
+                   help='number of entries [1000,10000,50000]')
+    p.add_argument('--repeat', type=int, default=3, help='best of N runs [3]')
+    p.add_argument('--check', metavar='PATH', nargs='+', type=Path, help='only check round-trip of PO files')
+    args = p.parse_args(argv)
+    if args.check:
+        failed = 0
+        for path in args.check:
+            errors = check(path)
+            print(f'{path}: {", ".join(errors) or "OK"}')
+            failed += bool(errors)
+        return 1 if failed else 0
+    print(f'{"Entries":>8}  {"Read polib":>10}  {"native":>8}  {"Write polib":>11}  {"native":>8}  Round-trip')
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = Path(tmp) / f'strings-{size}.po'
+            path.write_text(catalog(size), encoding='utf-8')
+            errors = check(path)
+            po = polib.pofile(str(path))
+            r_polib = best(lambda: polib.pofile(str(path)), args.repeat)
+            r_native = best(lambda: read_po(path), args.repeat)
+            w_polib = best(lambda: str(po), args.repeat)
+            w_native = best(lambda: format_po(po), args.repeat)
+            print(f'{size:8}  {r_polib:9.3f}s  {r_native:7.3f}s  {w_polib:10.3f}s  {w_native:7.3f}s'
+                  f'  {", ".join(errors) or "OK"}')
+            if errors:
+                return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
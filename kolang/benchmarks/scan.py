@@ -0,0 +1,79 @@
+"""Python label scanner benchmark: regex vs tokenize path on large generated sources.
+
+    python benchmarks/scan.py [--sizes 1000,10000,100000] [--density 0.3]
+
+Both paths must find the same labels (with the same source offsets), it is checked.
+"""
+
+from pathlib import Path
+import argparse
+import random
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from kolang.scanner import PyScanner  # noqa: E402
+
+
+TEXTS = ('Enabled', 'Play', 'Item #3', "It's", 'Say "hi"', 'x % y', 'Folder [B]')
+
+
+def _quote(rnd, text):
+    if rnd.random() < 0.5:
+        return '"{}"'.format(text.replace('"', r'\"'))
+    return "'{}'".format(text.replace("'", r"\'"))
+
+
+def source(lines, density=0.3, seed=1):
+    """Return Python source with `lines` statements, `density` part of them use labels."""
+    rnd = random.Random(seed)
+    out = ['import xbmcaddon', 'addon = xbmcaddon.Addon()', '']
+    for i in range(lines):
+        text = _quote(rnd, rnd.choice(TEXTS))
+        if rnd.random() >= density:
+            out.append(rnd.choice((
+                f'value_{i} = compute({i}, "plain text", key=\'{i}\')  # comment with "quotes"',
+                f'def func_{i}(a, b=None):\n    """Docstring {i}."""\n    return a + b',
+                f'items.append({{"id": {i}, "name": "item {i}"}})',
+            )))
+            continue
+        out.append(rnd.choice((
+            f'label = L({text})',
+            f'label = L({30000 + rnd.randrange(500)}, {text})',
+            f'title = addon.getLocalizedString({30000 + rnd.randrange(500)})',
+            f'title = addon.getLocalizedString({text})',
+            f'xbmc.executebuiltin("Notification($LOCALIZE[{30000 + rnd.randrange(500)}], $LOCALIZE[Done])")',
+        )))
+    return '\n'.join(out) + '\n'
+
+
+def run(scanner, data, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = scanner.scan(data)
+        t = time.perf_counter() - start
+        best = t if best is None else min(best, t)
+    return best, result
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.partition('\n')[0])
+    p.add_argument('--sizes', type=lambda s: [int(v) for v in s.split(',')], default=[1000, 10000, 100000],
+                   help='number of source statements [1000,10000,100000]')
+    p.add_argument('--density', type=float, default=0.3, help='part of statements with labels [0.3]')
+    p.add_argument('--repeat', type=int, default=3, help='best of N runs [3]')
+    args = p.parse_args(argv)
+    regex, tokens = PyScanner(), PyScanner(tokenize=True)
+    print(f'{"Lines":>8}  {"Size":>8}  {"Labels":>7}  {"Regex":>9}  {"Tokenize":>9}  {"Ratio":>6}')
+    for size in args.sizes:
+        data = source(size, args.density)
+        t_regex, expected = run(regex, data, args.repeat)
+        t_tokens, result = run(tokens, data, args.repeat)
+        assert result == expected, 'Different scan result'
+        print(f'{size:8}  {len(data) / 1024:7.0f}K  {len(result.labels):7}  {t_regex:8.3f}s  {t_tokens:8.3f}s'
+              f'  {t_tokens / t_regex:5.2f}x')
+
+
+if __name__ == '__main__':
+    main()
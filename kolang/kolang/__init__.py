@@ -10,13 +10,18 @@ from __future__ import annotations
 
 import re
 import string
+from bisect import insort
 from dataclasses import dataclass, field
 from collections import namedtuple
 from typing import Union, Optional
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
+import os
 import json
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from contextlib import nullcontext
 try:
     # faster implementation
     from lxml import etree
@@ -25,6 +30,9 @@ except ImportError:
     from xml.etree import ElementTree as etree
 import polib
 from .plural import plural_forms
+from .scanner import PyScan, XmlLabel, scan_py_file, scan_xml
+from .cache import ScanCache
+from .catalog import Catalog
 
 from logging import Logger
 logger = Logger('kolang')
@@ -61,6 +69,8 @@ class PyInput:
     path: Path
     data: str
     base: Path
+    #: Number of source edits (labels written), for stats.
+    edits: int = 0
 
 
 def local_now():
@@ -84,6 +94,25 @@ class SafeFormatter(string.Formatter):
 Trans = namedtuple('Trans', 'file start end fmt', defaults=('{label.id}',))
 
 
+def splice(data: str, edits: list[tuple[int, int, str]]) -> str:
+    """Replace `data[start:end]` with text for all (start, end, text) edits, in one pass.
+
+    The same edit could be given many times (merged labels share `Trans`), it is applied once.
+    """
+    edits = sorted(set(edits), key=lambda e: e[:2])
+    parts = []
+    pos = 0
+    prev = None
+    for start, end, text in edits:
+        if start < pos or start == prev:
+            raise ValueError(f'Overlapping source edits at {start}:{end}')
+        parts.append(data[pos:start])
+        parts.append(text)
+        pos, prev = end, start
+    parts.append(data[pos:])
+    return ''.join(parts)
+
+
 @dataclass
 class Label:
     """Single label occurace in xml or py."""
@@ -96,25 +125,78 @@ class Label:
 
 
 class LabelList(list):
-    """Just list with smart label add."""
+    """List of labels (with the same text) with smart label add, indexed by label ID.
+
+    Label ID must be changed by `set_id()` to keep the index valid.
+    """
+
+    def __init__(self, labels=()):
+        super().__init__()
+        #: Label positions (ascending) by label ID, None for labels without ID.
+        self._pos: dict[Optional[int], list[int]] = {}
+        #: Label position by label object (identity).
+        self._at: dict[int, int] = {}
+        for label in labels:
+            self.append(label)
+
+    def _index(self, label, i):
+        self._at[id(label)] = i
+        insort(self._pos.setdefault(label.id, []), i)
+
+    def _unindex(self, label):
+        i = self._at.pop(id(label))
+        pos = self._pos[label.id]
+        pos.remove(i)
+        if not pos:
+            del self._pos[label.id]
+        return i
+
+    def _first(self, lid):
+        pos = self._pos.get(lid)
+        return pos[0] if pos else None
+
+    def append(self, label):
+        self._index(label, len(self))
+        super().append(label)
+
+    def replace(self, old, new):
+        """Replace label `old` with `new` (on the same position)."""
+        i = self._unindex(old)
+        self[i] = new
+        self._index(new, i)
+
+    def set_id(self, label, lid):
+        """Change ID of label from the list."""
+        i = self._unindex(label)
+        label.id = lid
+        self._index(label, i)
+
+    def first_other(self, lid):
+        """Return the first label with ID other then `lid` or None."""
+        i = min((pos[0] for key, pos in self._pos.items() if key is not None and key != lid), default=None)
+        return None if i is None else self[i]
 
     def add(self, label):
-        """Add label in new ID, otherwise merge."""
-        for i, lb in enumerate(self):
-            if lb.id is None and label.id is not None:
-                lb.id = label.id  # still label ID if was None
-            if lb.id == label.id or label.id is None:
-                if not lb.text and label.text:
-                    lb.text = label.text
-                elif label.text is not None:
-                    assert label.text == lb.text
-                lb.nodes |= label.nodes
-                lb.trans.extend(label.trans)
-                # return i
-                return lb
-        self.append(label)
-        # return len(self) - 1
-        return label
+        """Add label in new ID, otherwise merge (into the first label with the same ID or without ID)."""
+        if label.id is None:
+            i = 0 if self else None
+        else:
+            i = self._first(label.id)
+            if (j := self._first(None)) is not None and (i is None or j < i):
+                i = j
+        if i is None:
+            self.append(label)
+            return label
+        lb = self[i]
+        if lb.id is None and label.id is not None:
+            self.set_id(lb, label.id)  # still label ID if was None
+        if not lb.text and label.text:
+            lb.text = label.text
+        elif label.text is not None:
+            assert label.text == lb.text
+        lb.nodes |= label.nodes
+        lb.trans.extend(label.trans)
+        return lb
 
 
 class NodeValue:
@@ -171,12 +253,10 @@ class Translate(TranslateBase):
     PLURAL_FORMS = {TranslateBase.lang_code(p.code): p.forms for p in plural_forms}
 
     _RE_LABEL_NUM = re.compile(r'#(?P<id>\d+)')
-    _RE_READ_PO = re.compile(r'(?:^|\n)(?P<var>(?:msgctxt|msgid|msgstr))[ \t]*'
-                             r'(?:[ \t]*[\n]"(?P<val>(?:\\.|[^"])*))+"')
-    _RE_PO_VAL = re.compile(r'\s*"((?:\\.|[^"])*)"')
 
     def __init__(self, *, dry_run=False, stats=True, id_from=30100, id_policy='max', handle_getLocalizedString=True,
-                 mark_translated=False, mark_obsoleted=True, backup_pattern='{}~'):
+                 mark_translated=False, mark_obsoleted=True, backup_pattern='{}~', py_tokenize=False,
+                 jobs=1, cache=None, native_po=False):
         self.xml_inputs: list[XmlInput] = []
         self.py_inputs: list[PyInput] = []
         self._ids: set[int] = set()
@@ -185,6 +265,16 @@ class Translate(TranslateBase):
         self.dry_run = dry_run
         self.stats = stats
         self.handle_getLocalizedString = handle_getLocalizedString
+        #: Scan Python sources with stdlib tokenizer instead of regex.
+        self.py_tokenize = py_tokenize
+        #: Number of processes for scanning Python sources, 0 - number of CPUs.
+        self.jobs = jobs
+        #: Scan cache file path (None - no cache).
+        self.cache = cache
+        self._cache: Optional[ScanCache] = None
+        self._catalogs: dict[Path, Catalog] = {}
+        #: Use native PO reader/writer (polib is used for not supported features).
+        self.native_po = native_po
         self.id_from = id_from
         self.id_policy = id_policy
         self.mark_translated = mark_translated
@@ -207,18 +297,16 @@ class Translate(TranslateBase):
             if L2.id is None:
                 label = Label(L1.id or L2.id, L1.text or L2.text, L1.nodes | L2.nodes, L1.trans + L2.trans)
                 self._by_id[label.id] = label
-                lst[lst.index[L2]] = label
+                lst.replace(L2, label)
             else:
                 assert L1.id is None or L1.id == L2.id
                 if L1.text and L1.text != L2.text:
                     if (L2 is label or not used) and L1.id is not None:
                         # text mismatch in the same ID, force to generate new ID (or find another existing)
-                        for lb in lst:
-                            if lb.id is not None and lb.id != L2.id:
-                                L2.id = lb.id
-                                break
+                        if (lb := lst.first_other(L2.id)) is not None:
+                            lst.set_id(L2, lb.id)
                         else:
-                            L2.id = None  # need to generate new ID
+                            lst.set_id(L2, None)  # need to generate new ID
                             L2.ref = L1
                             return L2
                     else:
@@ -234,26 +322,22 @@ class Translate(TranslateBase):
             self._ids.add(label.id)
         return label
 
-    def _scan_xml(self, tree: etree.Element):
-        """Scan single XML."""
-        def add(text, node):
-            if text.isdigit():
-                label = Label(int(text))
-            else:
-                label = Label(None, text)
-            if label is not None:
-                label.nodes.add(node)
-                self._add_label(label)
-
-        root = tree.getroot()
-        for node in root.iterfind('.//heading'):
-            add(node.text, NodeValue(node, None))
-        for attr in ('label', 'help'):
-            for node in root.iterfind(f'.//*[@{attr}]'):
-                add(node.get(attr), NodeValue(node, attr))
-        for node in root.iterfind('.//*[@lvalues]'):
-            for i, text in enumerate(node.get('lvalues').split('|')):
-                add(text, NodeValue(node, 'lvalues', index=i))
+    def _add_xml_labels(self, tree: etree.Element, found: list[XmlLabel]):
+        """Merge labels found in single XML."""
+        nodes = list(tree.getroot().iter()) if found else ()
+        for lb in found:
+            label = Label(lb.id, lb.text)
+            label.nodes.add(NodeValue(nodes[lb.node], lb.attr, index=lb.index))
+            self._add_label(label)
+
+    def _add_py_labels(self, file: PyInput, found: PyScan):
+        """Merge labels found in single Python source."""
+        self._ids.update(found.used)
+        for lb in found.labels:
+            label = Label(lb.id, lb.text)
+            if lb.start is not None:
+                label.trans.append(Trans(file, start=lb.start, end=lb.end, fmt=lb.fmt))
+            self._add_label(label)
 
     def load_xml(self, path: Union[str, Path], base: Optional[Union[str, Path]] = None):
         """Load XML and keep data."""
@@ -262,85 +346,56 @@ class Translate(TranslateBase):
             base = Path(base)
         tree = etree.parse(str(path))
         self.xml_inputs.append(XmlInput(path, tree, base))
-        self._scan_xml(tree)
+        cache = self._scan_cache()
+        if cache is None or (found := cache.get(path, self._scan_options())) is None:
+            found = scan_xml(tree.getroot())
+            if cache is not None:
+                cache.put(path, found, self._scan_options())
+        self._add_xml_labels(tree, found)
         return tree
 
-    def load_py(self, path: Union[str, Path], base: Optional[Union[str, Path]] = None):
-        """Load strings from Python source and keep data."""
-        def rstr(name='str'):
-            pat = '|'.join((
-                fr'"""(?P<{name}1>(?:\\.|.)*?)"""',   # """..."""
-                fr"'''(?P<{name}2>(?:\\.|.)*?)'''",   # '''...'''
-                fr'"(?P<{name}3>(?:\\.|[^"])*)"',     # "..."
-                fr"'(?P<{name}4>(?:\\.|[^'])*)'",     # '...'
-            ))
-            return f'(?:{pat})'
-
-        def rval(r, name='str'):
-            for i in range(4):
-                if (s := r[f'{name}{i+1}']) is not None:
-                    return s
-
-        def rstart(r, name='str'):
-            for i in range(4):
-                if (s := r.start(f'{name}{i+1}')) != -1:
-                    return s
-
+    def _scan_cache(self) -> Optional[ScanCache]:
+        """Return scan cache or None if cache is disabled."""
+        if self.cache is None:
+            return None
+        if self._cache is None:
+            self._cache = ScanCache(self.cache, {'kolang': __version__})
+        return self._cache
+
+    def _scan_options(self) -> dict:
+        """Return current scanner options (could be changed by add-on config), cached results depend on them."""
+        return {'get-localized-string': self.handle_getLocalizedString, 'tokenize': self.py_tokenize,
+                'id-policy': self.id_policy}
+
+    def save_cache(self):
+        """Save scan cache (if enabled and changed)."""
+        if self._cache is not None and not self.dry_run:
+            self._cache.save()
+            logger.info(f'Scan cache: {self._cache.hits} hit(s), {self._cache.misses} miss(es)')
+
+    def _py_scan_file(self):
+        """Python source file scanner for current options (picklable for process pool)."""
+        return partial(scan_py_file, handle_getLocalizedString=self.handle_getLocalizedString,
+                       tokenize=self.py_tokenize)
+
+    def _load_py(self, path: Union[str, Path], data: str, found: PyScan, base: Optional[Union[str, Path]] = None):
         if base is not None:
             base = Path(base)
-        with open(path) as f:
-            data = f.read()
         file = PyInput(path, data, base)
         self.py_inputs.append(file)
+        self._add_py_labels(file, found)
 
-        _R_CM = r'#\s*(?P<comment>.*)'
-        _R_LL = fr'\b(?P<label>LL?)\s*(?P<label_bracket>\()\s*(?:(?P<mid>\d+)\s*,\s*)?{rstr("msg")}\s*\)'
-        pat = f'{_R_CM}|{rstr()}|{_R_LL}'
-        if self.handle_getLocalizedString:
-            pat += fr'|\bgetLocalizedString\s*\((?P<gls>\s*(?:(?P<gls_id>\d+)|{rstr("gls_text")})\s*)\)'
-        R = re.compile(pat)
-        RS = re.compile(r'\$LOCALIZE\[(?:(?P<id>\d+)|(?P<text>(?:[\\%].|\[(?:[\\%].|[^]])*\]|[^]])+))\]')
-        RS_ESC = re.compile(r'[\\%](.)')
-        for r in R.finditer(data):
-            if r['comment'] is not None:  # skip comments
-                continue
-            label = tr = None
-            s, msg = rval(r), rval(r, 'msg')
-            sstart = rstart(r)
-            # L()
-            if msg is not None:
-                mid = r['mid']
-                if mid is None:
-                    offset = r.end('label_bracket')
-                    tr = Trans(file, start=offset, end=offset, fmt='{label.id}, ')
-                else:
-                    mid = int(mid)
-                    tr = Trans(file, start=r.start('mid'), end=r.end('mid'))
-                label = Label(mid, msg)
-            # " $LOCALIZE[] "
-            elif s is not None:
-                for r in RS.finditer(s):
-                    mid = r['id']
-                    if mid is not None:
-                        mid = int(mid)
-                    if r['text'] is not None:
-                        tr = Trans(file, start=sstart + r.start('text'), end=sstart + r.end('text'))
-                        text = RS_ESC.sub(r'\1', r['text'])
-                        label = Label(mid, text)
-                    elif mid is not None:
-                        self._ids.add(mid)  # mark as used
-            # getLocalizedString()
-            elif r['gls'] is not None:
-                mid = r['gls_id']
-                if mid is None:
-                    tr = Trans(file, start=r.start('gls'), end=r.end('gls'))
-                else:
-                    mid = int(mid)
-                label = Label(mid, rval(r, 'gls_text'))
-            if label is not None:
-                if tr is not None:
-                    label.trans.append(tr)
-                self._add_label(label)
+    def load_py(self, path: Union[str, Path], base: Optional[Union[str, Path]] = None):
+        """Load strings from Python source and keep data."""
+        cache = self._scan_cache()
+        if cache is None or (found := cache.get(path, self._scan_options())) is None:
+            data, found = self._py_scan_file()(path)
+            if cache is not None:
+                cache.put(path, found, self._scan_options())
+        else:
+            with open(path) as f:
+                data = f.read()
+        self._load_py(path, data, found, base)
 
     def _load_input(self, path: Path):
         """Load single file (XML / py) and keep data."""
@@ -348,35 +403,78 @@ class Translate(TranslateBase):
             return self.load_py(path)
         return self.load_xml(path)
 
-    def load_input(self, path: Union[str, Path]):
-        """Load input file / py-dir (XML / py) and keep data."""
-        res = None
+    def _input_files(self, path: Union[str, Path]) -> list[Path]:
+        """Return input files for file / py-dir."""
         path = Path(path)
         if not path.exists():
             logger.warning('Path does not exist: {!r}, skipping.'.format(str(path)))
-        elif path.is_dir():
-            for p in path.glob('**/*.py'):
-                res = self._load_input(p)
+            return []
+        if path.is_dir():
+            return list(path.glob('**/*.py'))
+        return [path]
+
+    def load_files(self, paths: list[Union[str, Path]]):
+        """Load input files (XML / py) and keep data.
+
+        Python sources are scanned in parallel (see `jobs`), labels are merged always in `paths` order.
+        Unchanged files are not scanned again if the scan cache is enabled.
+        """
+        paths = [Path(p) for p in paths]
+        cache = self._scan_cache()
+        options = self._scan_options()
+        cached = {}
+        if cache is not None:
+            for path in paths:
+                if path.suffix == '.py' and (found := cache.get(path, options)) is not None:
+                    cached[path] = found
+        missing = [p for p in paths if p.suffix == '.py' and p not in cached]
+        jobs = min(self.jobs or os.cpu_count() or 1, len(missing))
+        if jobs < 2:
+            executor = nullcontext()
+            scanned = map(self._py_scan_file(), missing)
         else:
-            res = self._load_input(path)
+            executor = ProcessPoolExecutor(jobs)
+            scanned = executor.map(self._py_scan_file(), missing, chunksize=max(1, len(missing) // (4 * jobs)))
+        res = None
+        with executor:
+            for path in paths:
+                if path.suffix != '.py':
+                    res = self.load_xml(path)
+                    continue
+                if path in cached:
+                    found = cached[path]
+                    with open(path) as f:
+                        data = f.read()
+                else:
+                    data, found = next(scanned)
+                    if cache is not None:
+                        cache.put(path, found, options)
+                res = self._load_py(path, data, found)
         return res
 
+    def load_input(self, path: Union[str, Path]):
+        """Load input file / py-dir (XML / py) and keep data."""
+        return self.load_files(self._input_files(path))
+
     def load_settings(self, path: Optional[Union[str, Path, None]] = None):
         path = Path(path or '')
         return self.load_input(path / 'resources' / 'settings.xml')
 
+    def catalog(self, path: Union[str, Path]) -> Catalog:
+        """Return PO catalog, the file is parsed once (shared by `load_translate()` and `translate()`)."""
+        key = Path(path).resolve()
+        catalog = self._catalogs.get(key)
+        if catalog is None:
+            catalog = self._catalogs[key] = Catalog.load(path, native=self.native_po)
+        return catalog
+
     def load_translate(self, path: Union[str, Path]):
         """Load XML and keep data."""
-        pofile = polib.pofile(path)
-        for entry in pofile:
+        for entry, mid in self.catalog(path):
             text = entry.msgid
             if self._RE_LABEL_NUM.fullmatch(text) and '[empty]' in entry.comment:
                 text = None
-            if (r := self._RE_LABEL_NUM.fullmatch(entry.msgctxt)) is None:
-                label = Label(None, entry.msgid)
-            else:
-                label = Label(int(r.group(1)), entry.msgid)
-            self._add_label(label, used=False)
+            self._add_label(Label(mid, entry.msgid), used=False)
 
     def scan(self):
         """Scan all loaded XML files."""
@@ -408,7 +506,7 @@ class Translate(TranslateBase):
         for lst in self._by_text.values():
             for label in lst:
                 if label.id is None:
-                    label.id = nextid()
+                    lst.set_id(label, nextid())
                     best = self._by_id.setdefault(label.id, label)
                     if label is not best:
                         best.nodes |= label.nodes
@@ -418,12 +516,19 @@ class Translate(TranslateBase):
             for node in label.nodes:
                 node.set_label(str(label.id))
                 self._ids.add(label.id)
-        trans = sorted(((label, tr) for label in self._by_id.values() for tr in label.trans),
-                       key=lambda x: -x[1].start)
-        for label, tr in trans:
-            fmt = f'{{before}}{tr.fmt}{{after}}'
-            tr.file.data = fmt.format(before=tr.file.data[:tr.start], after=tr.file.data[tr.end:], label=label)
-            self._ids.add(label.id)
+        # all edits of the file at once (PyInput is not hashable)
+        edits = {}
+        for label in self._by_id.values():
+            for tr in label.trans:
+                edits.setdefault(id(tr.file), (tr.file, []))[1].append((tr.start, tr.end, tr.fmt.format(label=label)))
+                self._ids.add(label.id)
+        for file, file_edits in edits.values():
+            try:
+                file.data = splice(file.data, file_edits)
+            except ValueError as exc:
+                raise ValueError(f'{file.path}: {exc}') from None
+            file.edits += len(set(file_edits))
+            logger.info(f'Edit py:   {file.path}: {file.edits} label(s)')
 
     def write(self):
         for input in self.xml_inputs:
@@ -479,7 +584,7 @@ class Translate(TranslateBase):
             path.parent.mkdir(parents=True, exist_ok=True)
         now = local_now()
         if path.exists():
-            po = polib.pofile(path)
+            catalog = self.catalog(path)
         else:
             po = polib.POFile()
             po.metadata = {
@@ -501,7 +606,9 @@ class Translate(TranslateBase):
                              '\nAddon id: {addon.id}'
                              '\nAddon Provider: {addon.provider}'),
             }
-        ie = {int(r['id']): e for e in po if (r := self._RE_LABEL_NUM.fullmatch(e.msgctxt)) is not None}
+            catalog = Catalog(path, po, native=self.native_po)
+        ie = catalog.by_id
+        new_entries = []
         for label in self._by_id.values():
             assert label.id is not None
             if label.id not in ie:
@@ -519,29 +626,27 @@ class Translate(TranslateBase):
                     comment=' '.join(comment),
                     # occurrences=[('welcome.py', '12'), ('anotherfile.py', '34')]
                 )
-                po.append(entry)
-        # fake translate: copy all EN entries as translated texts
-        if self.mark_translated:
-            for entry in po:
-                if not entry.obsolete and not entry.msgstr:
-                    entry.msgstr = entry.msgid
-        # remove obsolete flag if ID used again
-        for entry in po:
-            if entry.obsolete and (r := self._RE_LABEL_NUM.fullmatch(entry.msgctxt)) is not None:
-                mid = int(r.group('id'))
+                new_entries.append(entry)
+        for entry in new_entries:
+            catalog.append(entry)
+        # single pass over all entries
+        tr = 0
+        for entry, mid in catalog:
+            # fake translate: copy all EN entries as translated texts
+            if self.mark_translated and not entry.obsolete and not entry.msgstr:
+                entry.msgstr = entry.msgid
+            if mid is not None:
                 if mid in self._ids:
+                    # remove obsolete flag if ID used again
                     entry.obsolete = False
-        # mark obsolete if ID is not used in XML nor PY
-        if self.mark_obsoleted:
-            for entry in po:
-                if (r := self._RE_LABEL_NUM.fullmatch(entry.msgctxt)) is not None:
-                    mid = int(r.group('id'))
-                    if mid not in self._ids:
-                        entry.obsolete = True
+                elif self.mark_obsoleted:
+                    # mark obsolete if ID is not used in XML nor PY
+                    entry.obsolete = True
+            if entry.msgstr:
+                tr += 1
         if self.stats:
-            N = len(po)
+            N = len(catalog)
             ob = len(set(self._by_id) - self._ids)
-            tr = sum(1 for e in po if e.msgstr)
             if lang == 'en_GB':  # base language (no translation needed)
                 print(f'Language {lang}: translated: ---- ({tr}/{N}), obsolete: {ob}')
             else:
@@ -549,21 +654,22 @@ class Translate(TranslateBase):
         if self.dry_run:
             logger.info(f'Write po:  {path}')
         else:
-            po.save(path)
+            catalog.save(path)
+        self._catalogs.pop(path.resolve(), None)
 
     def load_addon_files(self, path):
         try:
             self.load_settings()
         except IOError:
             logger.info(f'No settring.xml in addon {path!r}')
-        for p in path.glob('*.py'):
-            self.load_input(p)
+        files = [f for p in path.glob('*.py') for f in self._input_files(p)]
         for p in (
             path / 'resources' / 'lib',
             path / 'lib',
         ):
             if p.exists():
-                self.load_input(p)
+                files.extend(self._input_files(p))
+        self.load_files(files)
 
     def load_addon_config(self, path):
         if path.is_dir():
@@ -578,6 +684,8 @@ class Translate(TranslateBase):
                 setattr(self, attr.replace('-', '_'), options[attr])
         if 'get-localized-string' in options:
             self.handle_getLocalizedString = options['get-localized-string']
+        if 'tokenize' in options:
+            self.py_tokenize = options['tokenize']
         base = path
         paths = []
         for source in conf.get('sources', []):
@@ -600,8 +708,7 @@ class Translate(TranslateBase):
             logger.warning(f'Invalid addon folder {path!r}, no addon.xml')
         conf = self.load_addon_config(path)
         if conf:
-            for p in conf.paths:
-                self.load_input(p)
+            self.load_files([f for p in conf.paths for f in self._input_files(p)])
         else:
             self.load_addon_files(path)
 
@@ -610,6 +717,7 @@ def process(inputs, *, args, langs=None, output=None, atype=None):
     trans = Translate(dry_run=args.dry_run, id_from=args.id_from, id_policy=args.id_policy,
                       handle_getLocalizedString=args.gls, backup_pattern=args.backup_pattern,
                       mark_translated=args.mark_translated, mark_obsoleted=args.mark_obsoleted,
+                      py_tokenize=args.tokenize, jobs=args.jobs, cache=args.cache, native_po=args.native_po,
                       )
     langs = {trans.lang_code(L) for L in langs or ()}
     base = ''
@@ -677,6 +785,7 @@ def process(inputs, *, args, langs=None, output=None, atype=None):
         if pattern:
             path = output / pattern.format(lang=lang, lang_lower=lang.lower())
         trans.translate(lang, path)
+    trans.save_cache()
 
 
 def lang_type(ss):
@@ -704,10 +813,18 @@ def main(argv=None):
                    help='handle getLocalizedString() [default]')
     p.add_argument('--no-get-localized-string', dest='gls', action='store_false',
                    help='skip getLocalizedString()')
+    p.add_argument('--tokenize', action='store_true',
+                   help='scan Python sources with tokenizer (handles multi-line strings) instead of regex')
     p.add_argument('--mark-obsoleted', action='store_true', default=True,
                    help='mark non-used translations as obsoleted [default]')
     p.add_argument('--no-mark-obsoleted', dest='mark_obsoleted', action='store_false',
                    help='ignore non-used translations')
+    p.add_argument('--native-po', action='store_true',
+                   help='use built-in PO reader/writer (faster, polib for not supported features)')
+    p.add_argument('--jobs', '-j', metavar='NUM', type=int, default=0,
+                   help='number of processes for scanning Python sources, 0 - number of CPUs [0]')
+    p.add_argument('--cache', metavar='PATH', type=Path,
+                   help='scan cache file (ex. .kolang-cache), unchanged files are not scanned again')
     p.add_argument('--backup-pattern', metavar='PATTERN', default='{}~', help='pattern for backup files [{}~]')
     p.add_argument('--dry-run', action='store_true', help='do not modify anything')
     p.add_argument('input', metavar='PATH', nargs='+', type=Path, help='path XML or PY file or addon folder')
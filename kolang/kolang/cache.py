@@ -0,0 +1,103 @@
+"""Persistent cache of label candidates found in input files (see `scanner`)."""
+
+from __future__ import annotations
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Union, Optional
+from .scanner import PyLabel, PyScan, XmlLabel
+from logging import Logger
+logger = Logger('kolang')
+
+
+def file_hash(path: Union[str, Path]) -> str:
+    """Return file content hash."""
+    with open(path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+class ScanCache:
+    """On-disk cache of scanned files (XML and Python).
+
+    Entry is valid if file size and mtime are the same or (if mtime changed, e.g. after checkout)
+    if the content hash is the same, and it was scanned with the same scanner options (add-ons
+    could have own options). Whole cache is dropped if `key` (kolang version) is changed.
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: Union[str, Path], key: dict):
+        self.path = Path(path)
+        self.key = key
+        self.files: dict[str, dict] = {}
+        self.dirty = False
+        #: Statistics: hit, miss.
+        self.hits = self.misses = 0
+        self.load()
+
+    def load(self):
+        """Load cache file, invalid or outdated cache is ignored (and rewritten)."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            self.dirty = True
+            return
+        if isinstance(data, dict) and data.get('version') == self.VERSION and data.get('key') == self.key:
+            self.files = data.get('files', {})
+        else:
+            self.dirty = True
+
+    def save(self):
+        """Save cache (if changed), entries of removed files are dropped. Write error is only logged."""
+        if not self.dirty:
+            return
+        self.files = {name: entry for name, entry in self.files.items() if os.path.exists(name)}
+        tmp = self.path.with_name(f'{self.path.name}.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'version': self.VERSION, 'key': self.key, 'files': self.files}, f,
+                          separators=(',', ':'))
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            logger.warning(f'Can not save scan cache {str(self.path)!r}: {exc}')
+            return
+        self.dirty = False
+
+    @staticmethod
+    def _name(path: Union[str, Path]) -> str:
+        return str(Path(path).resolve())
+
+    def get(self, path: Union[str, Path], options: dict) -> Optional[Union[PyScan, list[XmlLabel]]]:
+        """Return cached scan result or None if file is not cached, changed or scanned with other `options`."""
+        name = self._name(path)
+        entry = self.files.get(name)
+        if entry is not None and entry['options'] == options:
+            st = os.stat(path)
+            if entry['size'] == st.st_size:
+                if entry['mtime'] != st.st_mtime_ns and entry['hash'] == file_hash(path):
+                    entry['mtime'] = st.st_mtime_ns
+                    self.dirty = True
+                if entry['mtime'] == st.st_mtime_ns:
+                    self.hits += 1
+                    if 'xml' in entry:
+                        return [XmlLabel(*lb) for lb in entry['xml']]
+                    return PyScan([PyLabel(*lb) for lb in entry['py']], entry['used'])
+        self.misses += 1
+        return None
+
+    def put(self, path: Union[str, Path], found: Union[PyScan, list[XmlLabel]], options: dict):
+        """Store scan result of file, scanned with scanner `options`."""
+        st = os.stat(path)
+        entry = {'size': st.st_size, 'mtime': st.st_mtime_ns, 'hash': file_hash(path), 'options': options}
+        if isinstance(found, PyScan):
+            entry['py'] = found.labels
+            entry['used'] = found.used
+        else:
+            entry['xml'] = found
+        self.files[self._name(path)] = entry
+        self.dirty = True
@@ -0,0 +1,64 @@
+"""PO catalogs (strings.po), parsed once and indexed by label ID."""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Union, Optional, Iterator
+import polib
+from .po import read_po, save_po
+
+
+class Catalog:
+    """Single PO file, entries indexed by numeric msgctxt ID ("#30100")."""
+
+    _RE_LABEL_NUM = re.compile(r'#(?P<id>\d+)')
+
+    def __init__(self, path: Union[str, Path], po: polib.POFile, *, native: bool = False):
+        self.path = Path(path)
+        self.po = po
+        #: Use native PO reader/writer (see `po` module) instead of polib.
+        self.native = native
+        #: Label ID of every entry (in `po` order), None if msgctxt is not a label ID.
+        self.ids: list[Optional[int]] = []
+        #: Entry by label ID (the last one if ID is duplicated).
+        self.by_id: dict[int, polib.POEntry] = {}
+        for entry in po:
+            self._index(entry)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], *, native: bool = False) -> Catalog:
+        """Parse PO file."""
+        po = read_po(path) if native else polib.pofile(str(path))
+        return cls(path, po, native=native)
+
+    @classmethod
+    def label_id(cls, msgctxt: Optional[str]) -> Optional[int]:
+        """Return label ID from msgctxt ("#30100") or None."""
+        if msgctxt and (r := cls._RE_LABEL_NUM.fullmatch(msgctxt)) is not None:
+            return int(r['id'])
+        return None
+
+    def _index(self, entry: polib.POEntry):
+        mid = self.label_id(entry.msgctxt)
+        self.ids.append(mid)
+        if mid is not None:
+            self.by_id[mid] = entry
+
+    def __len__(self):
+        return len(self.po)
+
+    def __iter__(self) -> Iterator[tuple[polib.POEntry, Optional[int]]]:
+        """Iterate over (entry, label ID)."""
+        return zip(self.po, self.ids)
+
+    def append(self, entry: polib.POEntry):
+        """Add entry."""
+        self.po.append(entry)
+        self._index(entry)
+
+    def save(self, path: Optional[Union[str, Path]] = None):
+        if self.native:
+            save_po(self.po, path or self.path)
+        else:
+            self.po.save(str(path or self.path))
@@ -0,0 +1,309 @@
+"""Native PO reader and writer for the subset used by Kodi.
+
+Supported: header comments, metadata, msgctxt / msgid / msgstr (with continuation lines),
+translator (#) and extracted (#.) comments, occurrences (#:), flags (#,) and obsolete (#~) entries.
+
+Result is `polib.POFile` (the same as `polib.pofile()` gives) and output is the same as `POFile.save()`.
+Anything else (plural forms, previous msgid, syntax errors, non UTF-8 charset) raises `UnsupportedPo`
+and `read_po()` falls back to polib parser then. Entries with plural forms or previous msgid
+are formatted by polib.
+"""
+
+from __future__ import annotations
+
+import io
+import re
+import codecs
+import textwrap
+from itertools import chain
+from pathlib import Path
+from typing import Union
+import polib
+
+
+class UnsupportedPo(ValueError):
+    """PO file uses features not handled by native parser."""
+
+
+#: Characters escaped by `polib.escape()`.
+_RE_ESCAPE = re.compile(r'[\\\t\r\n\v\b\f"]')
+_RE_UNESCAPED_QUOTE = re.compile(r'([^\\]|^)"')
+#: Characters to escape or split lines on (`str.splitlines()`), field needs the full formatting.
+_RE_SPECIAL = re.compile('[\\\\\t\b"\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]')
+#: Charset, the same as `polib.detect_encoding()` does.
+_RE_CHARSET = re.compile(rb'"?Content-Type:.+? charset=([\w_\-:\.]+)')
+
+_KEYWORDS = {'msgctxt': 'ct', 'msgid': 'mi', 'msgstr': 'ms'}
+#: Allowed states before symbol (polib parser transitions for supported subset).
+_ALLOWED = {
+    'ct': {'st', 'he', 'gc', 'oc', 'fl', 'tc', 'ms'},
+    'mi': {'st', 'he', 'gc', 'oc', 'fl', 'ct', 'tc', 'ms'},
+    'ms': {'mi', 'tc'},
+}
+#: Entry field index for continuation line in state.
+_FIELDS = {'ct': 4, 'mi': 5, 'ms': 6}
+
+
+def _escape(s: str) -> str:
+    if _RE_ESCAPE.search(s) is None:
+        return s
+    return polib.escape(s)
+
+
+#: Default POEntry attributes, mutable ones are created for every entry.
+_ENTRY_DEFAULTS = vars(polib.POEntry())
+_ENTRY_MUTABLE = [(k, type(v)) for k, v in _ENTRY_DEFAULTS.items() if isinstance(v, (list, dict))]
+
+
+def _entry(**kwargs) -> polib.POEntry:
+    """Create POEntry, faster than `POEntry(**kwargs)`: all attributes are set at once."""
+    entry = polib.POEntry.__new__(polib.POEntry)
+    attrs = entry.__dict__
+    attrs.update(_ENTRY_DEFAULTS)
+    for key, cls in _ENTRY_MUTABLE:
+        attrs[key] = cls()
+    attrs.update(kwargs)
+    return entry
+
+
+def parse_po(lines, path=None, *, encoding='utf-8') -> polib.POFile:
+    """Parse PO lines (iterable of str), returns POFile. Raises UnsupportedPo."""
+    unescape = polib.unescape
+    po = polib.POFile(encoding=encoding, check_for_duplicates=False)
+    po.fpath = None if path is None else str(path)
+    entries = []
+    header = []
+    state = 'st'
+
+    def new_entry(linenum):
+        # entry fields: tcomment, comment, occurrences, flags, msgctxt, msgid, msgstr, obsolete, linenum
+        return ['', '', [], [], None, '', '', 0, linenum]
+
+    cur = new_entry(0)
+    last = ''
+    lines = iter(lines)
+    first = next(lines, '')
+    if first.startswith('\ufeff'):
+        first = first[1:]
+    for num, line in enumerate(chain((first,), lines), 1):
+        line = line.strip()
+        if not line:
+            continue
+        obsolete = 0
+        if line.startswith('#~'):
+            tokens = line.split(None, 2)
+            if tokens[0] != '#~' or len(tokens) < 2:
+                raise UnsupportedPo(f'Line {num}: {tokens[0]}')
+            line = line[3:].strip()
+            obsolete = 1
+        last = line
+        # continuation line (the most common)
+        if line[0] == '"':
+            if state not in _FIELDS:
+                raise UnsupportedPo(f'Line {num}: unexpected continuation line')
+            value = line[1:-1]
+            if '"' in value and _RE_UNESCAPED_QUOTE.search(value):
+                raise UnsupportedPo(f'Line {num}: unescaped double quote')
+            cur[_FIELDS[state]] += unescape(value) if '\\' in value else value
+            continue
+        tokens = line.split(None, 2)
+        tok = tokens[0]
+        if tok in _KEYWORDS and len(tokens) > 1:
+            symbol = _KEYWORDS[tok]
+            if state not in _ALLOWED[symbol]:
+                raise UnsupportedPo(f'Line {num}: unexpected {tok}')
+            value = line[len(tok):].lstrip()[1:-1]
+            if '"' in value and _RE_UNESCAPED_QUOTE.search(value):
+                raise UnsupportedPo(f'Line {num}: unescaped double quote')
+            if '\\' in value:
+                value = unescape(value)
+            if symbol == 'ms':
+                cur[6] = value
+            else:
+                if state == 'ms':
+                    entries.append(cur)
+                    cur = new_entry(num)
+                if symbol == 'ct':
+                    cur[4] = value
+                else:
+                    cur[7] = obsolete
+                    cur[5] = value
+            state = symbol
+        elif tok == '#' or tok.startswith('##'):
+            if state in ('st', 'he'):
+                header.append(line[2:])
+                state = 'he'
+                continue
+            if state == 'ct':
+                raise UnsupportedPo(f'Line {num}: unexpected comment')
+            if state == 'ms':
+                entries.append(cur)
+                cur = new_entry(num)
+            comment = line.lstrip('#')
+            if comment.startswith(' '):
+                comment = comment[1:]
+            cur[0] = f'{cur[0]}\n{comment}' if cur[0] else comment
+            state = 'tc'
+        elif tok in ('#.', '#:', '#,'):
+            if len(tokens) <= 1:
+                continue
+            if state == 'ms':
+                entries.append(cur)
+                cur = new_entry(num)
+            if tok == '#.':
+                cur[1] = f'{cur[1]}\n{line[3:]}' if cur[1] else line[3:]
+                state = 'gc'
+            elif tok == '#:':
+                for occurrence in line[3:].split():
+                    fil, sep, lnum = occurrence.rpartition(':')
+                    if not sep or not lnum.isdigit():
+                        fil, lnum = occurrence, ''
+                    cur[2].append((fil, lnum))
+                state = 'oc'
+            else:
+                cur[3].extend(c.strip() for c in line[3:].split(','))
+                state = 'fl'
+        else:
+            # plural forms, previous msgid (#|) or syntax error
+            raise UnsupportedPo(f'Line {num}: {tok}')
+    if last and last[0] != '#':
+        entries.append(cur)
+
+    po.header = '\n'.join(header)
+    po.extend(_entry(tcomment=tcomment, comment=comment, occurrences=occurrences, flags=flags, msgctxt=msgctxt,
+                     msgid=msgid, msgstr=msgstr, obsolete=obsolete, linenum=linenum)
+              for tcomment, comment, occurrences, flags, msgctxt, msgid, msgstr, obsolete, linenum in entries)
+    # metadata, the same entry as `po.find('')` gives
+    matches = [e for e in po if not e.obsolete and e.msgid == '']
+    if matches:
+        meta = matches[0]
+        if len(matches) > 1:
+            # the last one without msgctxt
+            meta = next((e for e in reversed(matches) if not e.msgctxt), meta)
+        po.remove(meta)
+        po.metadata_is_fuzzy = meta.flags
+        key = None
+        for msg in meta.msgstr.splitlines():
+            try:
+                key, val = msg.split(':', 1)
+                po.metadata[key] = val.strip()
+            except (ValueError, KeyError):
+                if key is not None:
+                    po.metadata[key] += '\n' + msg.strip()
+    return po
+
+
+def read_po(path: Union[str, Path]) -> polib.POFile:
+    """Read PO file, native parser with polib fallback."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    encoding = 'utf-8'
+    for r in _RE_CHARSET.finditer(data):
+        try:
+            charset = r[1].strip().decode('utf-8')
+            if codecs.lookup(charset).name != 'utf-8':
+                return polib.pofile(str(path))
+        except (LookupError, UnicodeDecodeError):
+            continue
+        encoding = charset
+        break
+    try:
+        return parse_po(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8'), path, encoding=encoding)
+    except (UnsupportedPo, UnicodeDecodeError):
+        return polib.pofile(str(path))
+
+
+def _str_field(fieldname, delflag, field, wrapwidth) -> str:
+    """The same as `polib._BaseEntry._str_field()` (without plural index), lines joined."""
+    if len(field) <= wrapwidth - len(fieldname) - 3 and _RE_SPECIAL.search(field) is None:
+        # fast path: single line, nothing to escape
+        return f'{delflag}{fieldname} "{field}"'
+    escaped = _escape(field)
+    # the same condition as polib (escaped chars are added, not subtracted)
+    fits = wrapwidth <= 0 or len(field) <= wrapwidth - len(fieldname) - 3 + len(escaped) - len(field)
+    lines = field.splitlines(True)
+    if len(lines) > 1:
+        lines = [''] + lines
+    elif not fits:
+        lines = [''] + [polib.unescape(item) for item in textwrap.wrap(
+            escaped, wrapwidth - 2, drop_whitespace=False, break_long_words=False)]
+    else:
+        return f'{delflag}{fieldname} "{escaped}"'
+    ret = [f'{delflag}{fieldname} "{_escape(lines.pop(0))}"']
+    for line in lines:
+        ret.append(f'{delflag}"{_escape(line)}"')
+    return '\n'.join(ret)
+
+
+#: Entry comments in the same order as installed polib writes them (translator comment first since 1.2.0).
+_COMMENTS = (('tcomment', '# '), ('comment', '#. '))
+if not str(polib.POEntry(comment='x', tcomment='x')).startswith('# '):
+    _COMMENTS = _COMMENTS[::-1]
+
+
+def _comments(ret, val, prefix, wrapwidth):
+    for comment in val.split('\n'):
+        if wrapwidth > 0 and len(comment) + len(prefix) > wrapwidth:
+            ret += textwrap.wrap(comment, wrapwidth, initial_indent=prefix, subsequent_indent=prefix,
+                                 break_long_words=False)
+        else:
+            ret.append(f'{prefix}{comment}')
+
+
+def format_entry(entry: polib.POEntry, wrapwidth: int = 78) -> str:
+    """Return entry as PO text, the same as `POEntry.__unicode__()`."""
+    if (entry.msgid_plural or entry.msgstr_plural or entry.previous_msgctxt is not None
+            or entry.previous_msgid is not None or entry.previous_msgid_plural is not None):
+        return entry.__unicode__(wrapwidth)
+    ret = []
+    for name, prefix in _COMMENTS:
+        # obsolete entry has translator comment only
+        if (val := getattr(entry, name)) and not (entry.obsolete and name == 'comment'):
+            _comments(ret, val, prefix, wrapwidth)
+    if entry.obsolete:
+        delflag = '#~ '
+    else:
+        delflag = ''
+        if entry.occurrences:
+            filestr = ' '.join(f'{fpath}:{lineno}' if lineno else fpath for fpath, lineno in entry.occurrences)
+            if wrapwidth > 0 and len(filestr) + 3 > wrapwidth:
+                ret += [line.replace('*', '-') for line in textwrap.wrap(
+                    filestr.replace('-', '*'), wrapwidth, initial_indent='#: ', subsequent_indent='#: ',
+                    break_long_words=False)]
+            else:
+                ret.append(f'#: {filestr}')
+    if entry.flags:
+        ret.append(f'#, {", ".join(entry.flags)}')
+    if entry.msgctxt is not None:
+        ret.append(_str_field('msgctxt', delflag, entry.msgctxt, wrapwidth))
+    ret.append(_str_field('msgid', delflag, entry.msgid, wrapwidth))
+    ret.append(_str_field('msgstr', delflag, entry.msgstr, wrapwidth))
+    ret.append('')
+    return '\n'.join(ret)
+
+
+def format_po(po: polib.POFile) -> str:
+    """Return PO file text, the same as `str(po)`."""
+    ret = []
+    for header in po.header.split('\n'):
+        if not header:
+            ret.append('#\n')
+        elif header[:1] in (',', ':'):
+            ret.append(f'#{header}\n')
+        else:
+            ret.append(f'# {header}\n')
+    wrapwidth = po.wrapwidth
+    entries = [format_entry(po.metadata_as_entry(), wrapwidth)]
+    entries += [format_entry(e, wrapwidth) for e in po if not e.obsolete]
+    entries += [format_entry(e, wrapwidth) for e in po if e.obsolete]
+    return ''.join(ret) + '\n'.join(entries)
+
+
+def save_po(po: polib.POFile, path: Union[str, Path, None] = None):
+    """Save PO file, the same as `po.save(path)`."""
+    if path is None:
+        path = po.fpath
+    with open(path, 'w', encoding=po.encoding) as f:
+        f.write(format_po(po))
+    if po.fpath is None:
+        po.fpath = str(path)
@@ -0,0 +1,257 @@
+"""Label scanners, extract label candidates from sources (pure functions, no Translate state).
+
+XML: `scan_xml()`, headings, label, help and lvalues attributes.
+
+Python: L(), LL(), getLocalizedString() and $LOCALIZE[] in strings.
+Scanner is created (patterns compiled) once per configuration, see `py_scanner()`.
+Two implementations give the same results:
+- regex (default), one combined pattern over whole source,
+- tokenize, stdlib tokenizer stream, no regex backtracking (falls back to regex if source could not be tokenized).
+
+Regex sees multi-line triple-quoted string as a sequence of simple strings (it fails if the string
+contains quotes), tokenize path handles strings like Python does. Prefixed strings (r"", f"") are
+scanned for $LOCALIZE[] only, not in L() or getLocalizedString() calls, in both paths.
+"""
+
+from __future__ import annotations
+
+import io
+import re
+import tokenize
+from collections import namedtuple
+from functools import lru_cache
+from typing import Iterator
+
+
+#: Label found in source: label ID and text (could be None) and source edit (start, end, format) or None.
+PyLabel = namedtuple('PyLabel', 'id text start end fmt', defaults=(None, None, '{label.id}'))
+
+#: Scan result: found labels (in source order) and used label IDs (no label, just mark as used).
+PyScan = namedtuple('PyScan', 'labels used')
+
+#: Label found in XML: label ID or text, node position (in `root.iter()` order), attribute and lvalues index.
+XmlLabel = namedtuple('XmlLabel', 'id text node attr index', defaults=(None,))
+
+
+def scan_xml(root) -> list[XmlLabel]:
+    """Scan XML tree (root element), returns found labels."""
+    found = []
+    pos = {node: i for i, node in enumerate(root.iter())}
+
+    def add(text, node, attr, index=None):
+        if text.isdigit():
+            found.append(XmlLabel(int(text), None, pos[node], attr, index))
+        else:
+            found.append(XmlLabel(None, text, pos[node], attr, index))
+
+    for node in root.iterfind('.//heading'):
+        add(node.text, node, None)
+    for attr in ('label', 'help'):
+        for node in root.iterfind(f'.//*[@{attr}]'):
+            add(node.get(attr), node, attr)
+    for node in root.iterfind('.//*[@lvalues]'):
+        for i, text in enumerate(node.get('lvalues').split('|')):
+            add(text, node, 'lvalues', i)
+    return found
+
+
+def _rstr(name='str'):
+    pat = '|'.join((
+        fr'"""(?P<{name}1>(?:\\.|.)*?)"""',   # """..."""
+        fr"'''(?P<{name}2>(?:\\.|.)*?)'''",   # '''...'''
+        fr'"(?P<{name}3>(?:\\.|[^"])*)"',     # "..."
+        fr"'(?P<{name}4>(?:\\.|[^'])*)'",     # '...'
+    ))
+    return f'(?:{pat})'
+
+
+def _rval(r, name='str'):
+    for i in range(4):
+        if (s := r[f'{name}{i+1}']) is not None:
+            return s
+
+
+def _rstart(r, name='str'):
+    for i in range(4):
+        if (s := r.start(f'{name}{i+1}')) != -1:
+            return s
+
+
+class PyScanner:
+    """Find labels in Python source."""
+
+    #: $LOCALIZE[id] or $LOCALIZE[text] in strings.
+    RS = re.compile(r'\$LOCALIZE\[(?:(?P<id>\d+)|(?P<text>(?:[\\%].|\[(?:[\\%].|[^]])*\]|[^]])+))\]')
+    RS_ESC = re.compile(r'[\\%](.)')
+    _RE_PREFIX = re.compile(r'[a-zA-Z]*')
+
+    def __init__(self, *, handle_getLocalizedString: bool = True, tokenize: bool = False):
+        self.handle_getLocalizedString = handle_getLocalizedString
+        self.tokenize = tokenize
+        _R_CM = r'#\s*(?P<comment>.*)'
+        _R_LL = fr'\b(?P<label>LL?)\s*(?P<label_bracket>\()\s*(?:(?P<mid>\d+)\s*,\s*)?{_rstr("msg")}\s*\)'
+        pat = f'{_R_CM}|{_rstr()}|{_R_LL}'
+        if handle_getLocalizedString:
+            pat += fr'|\bgetLocalizedString\s*\((?P<gls>\s*(?:(?P<gls_id>\d+)|{_rstr("gls_text")})\s*)\)'
+        self.R = re.compile(pat)
+
+    def scan(self, data: str) -> PyScan:
+        """Scan source code, returns found labels and used IDs."""
+        result = PyScan([], [])
+        if self.tokenize:
+            try:
+                self._scan_tokens(data, result)
+                return result
+            except (tokenize.TokenError, SyntaxError):
+                result = PyScan([], [])
+        self._scan_regex(data, result)
+        return result
+
+    def _localize(self, s: str, sstart: int, result: PyScan):
+        """Scan string for $LOCALIZE[], returns label (the last one with text) or None."""
+        label = None
+        for r in self.RS.finditer(s):
+            mid = r['id']
+            if mid is not None:
+                mid = int(mid)
+            if r['text'] is not None:
+                text = self.RS_ESC.sub(r'\1', r['text'])
+                label = PyLabel(mid, text, sstart + r.start('text'), sstart + r.end('text'))
+            elif mid is not None:
+                result.used.append(mid)  # mark as used
+        return label
+
+    def _scan_regex(self, data: str, result: PyScan):
+        for r in self.R.finditer(data):
+            if r['comment'] is not None:  # skip comments
+                continue
+            label = None
+            s, msg = _rval(r), _rval(r, 'msg')
+            # L()
+            if msg is not None:
+                mid = r['mid']
+                if mid is None:
+                    offset = r.end('label_bracket')
+                    label = PyLabel(None, msg, offset, offset, '{label.id}, ')
+                else:
+                    label = PyLabel(int(mid), msg, r.start('mid'), r.end('mid'))
+            # " $LOCALIZE[] "
+            elif s is not None:
+                label = self._localize(s, _rstart(r), result)
+            # getLocalizedString()
+            elif r['gls'] is not None:
+                mid = r['gls_id']
+                if mid is None:
+                    label = PyLabel(None, _rval(r, 'gls_text'), r.start('gls'), r.end('gls'))
+                else:
+                    label = PyLabel(int(mid), None)
+            if label is not None:
+                result.labels.append(label)
+
+    def _tokens(self, data: str) -> Iterator[tuple[int, str, int, int]]:
+        """Yield significant tokens (type, string, start offset, end offset), f-string is one STRING token."""
+        lines = [0]
+        for line in io.StringIO(data):
+            lines.append(lines[-1] + len(line))
+        skip = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT}
+        fstring_start = getattr(tokenize, 'FSTRING_START', None)
+        fstring_end = getattr(tokenize, 'FSTRING_END', None)
+        depth = 0
+        for tok in tokenize.generate_tokens(io.StringIO(data).readline):
+            if tok.type in skip:
+                continue
+            if tok.type == tokenize.ERRORTOKEN and not tok.string.isspace():
+                raise tokenize.TokenError('Invalid token', tok.start)
+            start = lines[tok.start[0] - 1] + tok.start[1]
+            # Python 3.12+, the whole f-string as one string
+            if tok.type == fstring_start:
+                if depth == 0:
+                    fstart = start
+                depth += 1
+                continue
+            if depth:
+                if tok.type == fstring_end:
+                    depth -= 1
+                    if depth == 0:
+                        end = lines[tok.end[0] - 1] + tok.end[1]
+                        yield tokenize.STRING, data[fstart:end], fstart, end
+                continue
+            yield tok.type, tok.string, start, lines[tok.end[0] - 1] + tok.end[1]
+
+    def _string(self, tok, *, plain=False):
+        """Return string token content and its start offset. If `plain`, prefixed string (r"", f"") gives None."""
+        _, text, start, _ = tok
+        prefix = len(self._RE_PREFIX.match(text)[0])
+        if plain and prefix:
+            return None, None
+        quote = 3 if text.startswith(('"""', "'''"), prefix) else 1
+        return text[prefix + quote:len(text) - quote], start + prefix + quote
+
+    def _scan_tokens(self, data: str, result: PyScan):
+        NAME, OP, NUMBER, STRING = tokenize.NAME, tokenize.OP, tokenize.NUMBER, tokenize.STRING
+        tokens = list(self._tokens(data))
+        n = len(tokens)
+        i = 0
+
+        def match(*pattern):
+            """Check token types/strings from position i+1, (type, string) or type only."""
+            if i + len(pattern) >= n:
+                return False
+            for k, want in enumerate(pattern, i + 1):
+                typ, text, _, _ = tokens[k]
+                if isinstance(want, tuple):
+                    if (typ, text) != want:
+                        return False
+                elif typ != want:
+                    return False
+            return True
+
+        def digits(tok):
+            return tok[0] == NUMBER and tok[1].isdigit()
+
+        def plain(k):
+            # regex path handles only non-prefixed strings in calls
+            return self._string(tokens[k], plain=True)[0]
+
+        while i < n:
+            typ, text, _, _ = tok = tokens[i]
+            if typ == NAME and text in ('L', 'LL') and match((OP, '(')):
+                # L(text) or L(id, text)
+                if match((OP, '('), STRING, (OP, ')')) and (msg := plain(i + 2)) is not None:
+                    offset = tokens[i + 1][3]
+                    result.labels.append(PyLabel(None, msg, offset, offset, '{label.id}, '))
+                    i += 4
+                    continue
+                if (match((OP, '('), NUMBER, (OP, ','), STRING, (OP, ')')) and digits(tokens[i + 2])
+                        and (msg := plain(i + 4)) is not None):
+                    _, mid, mstart, mend = tokens[i + 2]
+                    result.labels.append(PyLabel(int(mid), msg, mstart, mend))
+                    i += 6
+                    continue
+            elif typ == NAME and text == 'getLocalizedString' and self.handle_getLocalizedString:
+                if match((OP, '('), STRING, (OP, ')')) and (msg := plain(i + 2)) is not None:
+                    result.labels.append(PyLabel(None, msg, tokens[i + 1][3], tokens[i + 3][2]))
+                    i += 4
+                    continue
+                if match((OP, '('), NUMBER, (OP, ')')) and digits(tokens[i + 2]):
+                    result.labels.append(PyLabel(int(tokens[i + 2][1]), None))
+                    i += 4
+                    continue
+            elif typ == STRING:
+                s, sstart = self._string(tok)
+                if (label := self._localize(s, sstart, result)) is not None:
+                    result.labels.append(label)
+            i += 1
+
+
+def scan_py_file(path, *, handle_getLocalizedString: bool = True, tokenize: bool = False) -> tuple[str, PyScan]:
+    """Read and scan Python source file, returns source and scan result (used as process pool worker)."""
+    with open(path) as f:
+        data = f.read()
+    return data, py_scanner(handle_getLocalizedString=handle_getLocalizedString, tokenize=tokenize).scan(data)
+
+
+@lru_cache(maxsize=None)
+def py_scanner(*, handle_getLocalizedString: bool = True, tokenize: bool = False) -> PyScanner:
+    """Return scanner for configuration, patterns are compiled once."""
+    return PyScanner(handle_getLocalizedString=handle_getLocalizedString, tokenize=tokenize)